@@ -19,7 +19,7 @@ def main():
     #     df="accounts_to_reactivate_ICPS.xlsx",  # ya con BUS ID + accountid
     #     bus_id_columns=["BUS ID"],
     #     # note_id_column="annotationid",  # si decides extraer esto antes
-    #     output_path="reactivated_accounts_results.xlsx",
+    #     output_path="reactivated_accounts_results.csv",
     # )
 
     # print("Done. Reactivation results saved.")
@@ -40,15 +40,15 @@ def main():
         reason_text= reason,
         performed_by="<strong>Josue Cruz with Dataverse_APIs (Batch #3)</strong><br>"
             "Supervised by: <strong>Trung Quach</strong> and <strong>Leila Rigor</strong><br>",
-        output_path="data/deactivated_accounts_results.xlsx",
+        output_path="data/deactivated_accounts_results.csv",
     )
 
-    print("Done. Results saved to data/deactivated_accounts_results.xlsx")
+    print("Done. Results saved to data/deactivated_accounts_results.csv")
     print(results_df.head())    
     ## DEACTIVATE ACCOUNTS END
     
-    # accounts = fetch_accounts_from_ICPS()
-    # print(f"Fetched {len(accounts)} accounts from ICPS.")
+    # accounts_written = fetch_accounts_from_ICPS()
+    # print(f"Fetched {accounts_written} accounts from ICPS.")
     
     #Create new account
     # resp = call_create_account(
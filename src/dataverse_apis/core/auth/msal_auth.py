@@ -1,5 +1,6 @@
 import os
 import time
+import threading
 from datetime import datetime, timedelta
 from ..services.env_loader import get_env_variable_value
 from msal import PublicClientApplication, TokenCache # msal Microsoft Authentication Library
@@ -67,78 +68,111 @@ app = PublicClientApplication(
     token_cache=token_cache
 )
 
-# Global variable to save the current token
+# Global variable to save the current token: {"access_token": str, "expires_at": monotonic seconds}
 _cached_token = None
+_token_lock = threading.Lock()
+# Refresh a bit before the real expiry so in-flight requests don't fail with 401
+TOKEN_EXPIRY_MARGIN = 60
+
+def _get_cached_access_token() -> str | None:
+    """Returns the cached access token while it is still valid, without touching MSAL."""
+    if _cached_token and time.monotonic() < _cached_token["expires_at"]:
+        return _cached_token["access_token"]
+    return None
+
+def _cache_token(result: dict) -> str:
+    """Stores the MSAL result with an absolute expiry and returns the access token."""
+    global _cached_token
+    expires_in = int(result.get("expires_in") or 0)
+    _cached_token = {
+        "access_token": result["access_token"],
+        "expires_at": time.monotonic() + max(expires_in - TOKEN_EXPIRY_MARGIN, 0),
+    }
+    return result["access_token"]
 
 def dump_msal_config():
     log.info("Configuration MSAL Auth:")
-    log.info(f"API URL: {api_url}  Version: {api_version}")
-    log.info(f"username: {username}")
+    log.info("API URL: %s  Version: %s", api_url, api_version)
+    log.info("username: %s", username)
     # log.info(f"client id: {client_id}")
     # log.info(f"Authority: {authority}  Tenant id: {tenant_id}  scopes: {scopes} ")
     # log.info(f"WebAPI URL: {webapi_url}")
 
 def get_access_token_with_username():    
     # dump_msal_config() # just for debugging purposes
-    global _cached_token
-    
+
     # If there is already a valid token in the global cache, we return it.
-    if _cached_token and "access_token" in _cached_token:
-        return _cached_token["access_token"]
+    token = _get_cached_access_token()
+    if token:
+        return token
+
+    # Only one thread may go to MSAL (and possibly open the browser) at a time
+    with _token_lock:
+        token = _get_cached_access_token()
+        if token:
+            return token
+
+        accounts = app.get_accounts(username=username)
+        if accounts:
+            result = app.acquire_token_silent(scopes, account=accounts[0])
+            if result and "access_token" in result:
+                return _cache_token(result)
+
+        print("Opening browser for interactive login...")
+        log.info("Opening browser for interactive login...")
+        
+        result = app.acquire_token_interactive(
+            scopes=scopes,
+            login_hint=username
+        )
+        if "access_token" in result:
+            return _cache_token(result)
+        else:
+            raise Exception(f"Error getting token: {result.get('error_description')}")
     
-    accounts = app.get_accounts(username=username)
-    if accounts:
-        result = app.acquire_token_silent(scopes, account=accounts[0])
-        if result and "access_token" in result:
-            return result["access_token"]
-
-    print("Opening browser for interactive login...")
-    log.info("Opening browser for interactive login...")
-    
-    result = app.acquire_token_interactive(
-        scopes=scopes,
-        login_hint=username
-    )
-    if "access_token" in result:
-        return result["access_token"]
-    else:
-        raise Exception(f"Error getting token: {result.get('error_description')}")
-    
-def get_access_token_with_msal_default():
+def get_access_token_with_msal_default(force_refresh: bool = False):
+    """
+    Returns a Dataverse access token (cached until shortly before it expires).
+    force_refresh=True skips both caches, e.g. after the server rejected the token with 401.
+    """
     # dump_msal_config() # just for debugging purposes
-    global _cached_token
     
     # log.info("Getting access token with MSAL default method...")
     
     # If there is already a valid token in the global cache, we return it.
-    if _cached_token and "access_token" in _cached_token:
-        return _cached_token["access_token"]
-    
-    # 1. Search for cached accounts
-    accounts = app.get_accounts()
-    if accounts:
-        print("Cached Accounts:")
-        log.info(f"Found {len(accounts)} cached accounts.")
-        for idx, acc in enumerate(accounts):
-            print(f"{idx + 1}. {acc['username']}")
-        chosen = accounts[0]  # By default, the first
-        print(f"Using account: {chosen['username']}")
-        result = app.acquire_token_silent(scopes, account=chosen)
-        if result and "access_token" in result:
-            _cached_token = result
-            log_token_expiration(result)
-            return result["access_token"]
-
-    # 2. No valid token, open browser
-    print("There is no active session. A browser will open for you to log in.")
-    log.info("There is no active session. A browser will open for you to log in.")
-    result = app.acquire_token_interactive(scopes=scopes)
-    if "access_token" in result:
-        _cached_token = result
-        log_token_expiration(result) 
-        return result["access_token"]
-    else:
-        raise Exception(f"Error getting token: {result.get('error_description')}")
+    token = None if force_refresh else _get_cached_access_token()
+    if token:
+        return token
+
+    # Only one thread may go to MSAL (and possibly open the browser) at a time
+    with _token_lock:
+        token = None if force_refresh else _get_cached_access_token()
+        if token:
+            return token
+
+        # 1. Search for cached accounts
+        accounts = app.get_accounts()
+        if accounts:
+            print("Cached Accounts:")
+            log.info("Found %s cached accounts.", len(accounts))
+            for idx, acc in enumerate(accounts):
+                print(f"{idx + 1}. {acc['username']}")
+            chosen = accounts[0]  # By default, the first
+            print(f"Using account: {chosen['username']}")
+            result = app.acquire_token_silent(scopes, account=chosen, force_refresh=force_refresh)
+            if result and "access_token" in result:
+                log_token_expiration(result)
+                return _cache_token(result)
+
+        # 2. No valid token, open browser
+        print("There is no active session. A browser will open for you to log in.")
+        log.info("There is no active session. A browser will open for you to log in.")
+        result = app.acquire_token_interactive(scopes=scopes)
+        if "access_token" in result:
+            log_token_expiration(result) 
+            return _cache_token(result)
+        else:
+            raise Exception(f"Error getting token: {result.get('error_description')}")
     
 def log_token_expiration(result):
     """
@@ -157,7 +191,8 @@ def log_token_expiration(result):
     expiration_time = now + timedelta(seconds=int(expires_in))
 
     log.info(
-        f"Token expires in {expires_in} seconds "
-        f"({expires_in/60:.1f} minutes)."
+        "Token expires in %s seconds (%.1f minutes).",
+        expires_in,
+        expires_in / 60,
     )
-    log.info(f"Token will expire at: {expiration_time.strftime('%Y-%m-%d %H:%M:%S')}")
\ No newline at end of file
+    log.info("Token will expire at: %s", expiration_time.strftime('%Y-%m-%d %H:%M:%S'))
\ No newline at end of file
@@ -1,37 +1,47 @@
-import os, subprocess, ctypes
+import os, ctypes
 from ctypes import wintypes
+from functools import lru_cache
 
-def _get_upn_via_winapi() -> str | None:
-    # NameUserPrincipal = 8 (Windows Secur32)
-    NameUserPrincipal = 8
+# EXTENDED_NAME_FORMAT values (Windows Secur32)
+NameSamCompatible = 2
+NameUserPrincipal = 8
+
+def _get_user_name_ex(name_format: int) -> str | None:
     try:
         GetUserNameExW = ctypes.windll.secur32.GetUserNameExW  # type: ignore[attr-defined]
     except Exception:
         return None
     size = wintypes.ULONG(0)
     # First call to get required buffer size
-    GetUserNameExW(NameUserPrincipal, None, ctypes.byref(size))
+    GetUserNameExW(name_format, None, ctypes.byref(size))
     if not size.value:
         return None
     buf = ctypes.create_unicode_buffer(size.value + 1)
-    ok = GetUserNameExW(NameUserPrincipal, buf, ctypes.byref(size))
-    return buf.value if ok and "@" in buf.value else None
+    ok = GetUserNameExW(name_format, buf, ctypes.byref(size))
+    return buf.value if ok and buf.value else None
 
-def _get_upn_via_whoami() -> str | None:
-    try:
-        out = subprocess.check_output(["whoami", "/upn"], text=True, stderr=subprocess.STDOUT).strip()
-        return out if out and "@" in out else None
-    except Exception:
+def _get_upn_via_winapi() -> str | None:
+    upn = _get_user_name_ex(NameUserPrincipal)
+    return upn if upn and "@" in upn else None
+
+def _get_upn_via_sam_name() -> str | None:
+    # DOMAIN\user (no process spawn, unlike `whoami /upn`) + USERDNSDOMAIN => user@domain
+    sam = _get_user_name_ex(NameSamCompatible)
+    dns_domain = os.environ.get("USERDNSDOMAIN")  # e.g. ONTARIO.CA
+    if not sam or not dns_domain:
         return None
+    user = sam.rsplit("\\", 1)[-1]
+    return f"{user}@{dns_domain.lower()}" if user else None
 
+@lru_cache(maxsize=8)
 def get_current_user_email(default_domain: str = "ontario.ca") -> str | None:
     # 1) WinAPI (UPN)
     upn = _get_upn_via_winapi()
     if upn:
         return upn
 
-    # 2) whoami /upn
-    upn = _get_upn_via_whoami()
+    # 2) WinAPI (SAM name) + USERDNSDOMAIN
+    upn = _get_upn_via_sam_name()
     if upn:
         return upn
 
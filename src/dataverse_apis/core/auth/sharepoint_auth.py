@@ -1,20 +1,44 @@
 from msal import PublicClientApplication
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 client_id = "1fec8e78-bce4-4aaf-ab1b-5451cc387264"  # Postman client ID
 authority = "https://login.microsoftonline.com/common"
 scopes = ["Files.Read.All", "Sites.Read.All", "User.Read"]
 
 app = PublicClientApplication(client_id, authority=authority)
-result = app.acquire_token_interactive(scopes=scopes)
-
-token = result.get("access_token")
-print("Access token:", token)
-
-# Test request to Graph
-response = requests.get(
-    "https://graph.microsoft.com/v1.0/me/drive/root/children",
-    headers={"Authorization": f"Bearer {token}"}
-)
-print(response.status_code)
-print(response.json())
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+
+# Reused across Graph calls (TCP/TLS keep-alive), with retries on throttling/transient errors
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+def get_graph_token() -> str | None:
+    """Opens the interactive login and returns a Microsoft Graph access token."""
+    result = app.acquire_token_interactive(scopes=scopes)
+    return result.get("access_token")
+
+def graph_get(path: str, token: str) -> requests.Response:
+    """GET `path` (relative to GRAPH_BASE_URL) on the pooled session."""
+    return _session.get(
+        f"{GRAPH_BASE_URL}/{path.lstrip('/')}",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+
+def _debug():
+    token = get_graph_token()
+    print("Access token:", token)
+
+    # Test request to Graph
+    response = graph_get("me/drive/root/children", token)
+    print(response.status_code)
+    return response.json()
+
+if __name__ == "__main__":
+    print(_debug())
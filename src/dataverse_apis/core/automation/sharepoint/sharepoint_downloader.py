@@ -1,24 +1,35 @@
 import os
 import time
-import glob
+import queue
+import re
+import shutil
+import struct
+import threading
 import zipfile
 import sys
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from shutil import which
 from ...services.runtime_paths import resolve_runtime_path
 from ...logging.logging_conf import get_logger
-from ..web_helper.browser import make_brave_driver
 from pathlib import Path
-from selenium import webdriver
-from selenium.common.exceptions import WebDriverException 
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.edge.service import Service as EdgeService
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.edge.options import Options as EdgeOptions
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, ElementNotInteractableException
+# Only the exception classes are imported eagerly (cheap); selenium.webdriver and the
+# browser helpers are imported inside the functions that start/drive a browser.
+from selenium.common.exceptions import WebDriverException, NoSuchElementException, TimeoutException
 
 log = get_logger(__name__)
+
+# Optional: event-driven download detection (ReadDirectoryChangesW / inotify) via watchdog.
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    _HAS_WATCHDOG = True
+except Exception:
+    _HAS_WATCHDOG = False
+    Observer = None
+    FileSystemEventHandler = object
+
 # ------------------------
 # Driver Setup
 # ------------------------
@@ -29,10 +40,23 @@ edgedriver_path = os.path.join(current_dir, "drivers", "msedgedriver.exe")
 
 APP_NAME = "DataFlipper"
 
+# ------------------------
+# Locators (CSS selectors are matched natively by the browser, no XPath engine)
+# ------------------------
+_DOWNLOAD_BTN_CSS = "button[data-automationid='downloadCommand']"
+_MORE_BTN_CSS = "button[aria-label*='More'],button[data-automationid*='more']"
+_EMPTY_PLACEHOLDER_CSS = "div[data-automationid='list-empty-placeholder-title']"
+
+# Plain (by, value) tuples; "css selector" == By.CSS_SELECTOR (no selenium.webdriver import needed)
+_DOWNLOAD_BTN = ("css selector", _DOWNLOAD_BTN_CSS)
+_EMPTY_PLACEHOLDER = ("css selector", _EMPTY_PLACEHOLDER_CSS)
+
+@lru_cache(maxsize=1)
 def _get_writable_base_dir() -> Path:
     """Returns a writable folder to store downloads folder:
     - EXE: folder for the .exe; if not allowed, it falls to %LOCALAPPDATA%\\<APP_NAME>
     - Dev: cwd
+    Evaluated once per process (the permission probe writes a file).
     """
     if getattr(sys, "frozen", False):
         exe_dir = Path(sys.executable).parent
@@ -46,6 +70,7 @@ def _get_writable_base_dir() -> Path:
             return Path(os.getenv("LOCALAPPDATA", str(Path.home()))) / APP_NAME
     return Path.cwd()
 
+@lru_cache(maxsize=8)
 def _resolve_driver(exe_name: str) -> str:
     """
     Returns the path to the driver:
@@ -68,6 +93,11 @@ def brave_exists():
     return os.path.exists(brave_path)
 
 def setup_driver(download_folder):
+    from selenium import webdriver
+    from selenium.webdriver.edge.service import Service as EdgeService
+    from selenium.webdriver.edge.options import Options as EdgeOptions
+    from ..web_helper.browser import make_brave_driver
+
     prefs = {
         "download.prompt_for_download": False,
         "safebrowsing.enabled": True,
@@ -103,41 +133,119 @@ def setup_driver(download_folder):
         service = EdgeService(edgedriver_path)
         return webdriver.Edge(service=service, options=options)
 
+def _wait_for_folder_page(driver, timeout: float = 15.0) -> None:
+    """
+    Waits until the SharePoint folder page is usable: the Download button, the
+    empty-folder placeholder or a 'Page not found' message is present.
+    On timeout it just returns and lets the regular checks decide.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    try:
+        WebDriverWait(driver, timeout).until(EC.any_of(
+            EC.presence_of_element_located(_DOWNLOAD_BTN),
+            EC.presence_of_element_located(_EMPTY_PLACEHOLDER),
+            EC.text_to_be_present_in_element((By.TAG_NAME, "body"), "Page not found"),
+        ))
+    except TimeoutException:
+        log.warning("SharePoint page not ready after %.0fs, continuing anyway", timeout)
+
+_PAGE_NOT_FOUND_JS = """
+const marker = arguments[0];
+if (document.title.indexOf(marker) !== -1) { return false; }
+return !(document.body && document.body.innerText.indexOf(marker) !== -1);
+"""
+
 def is_valid_url(driver):
     # Check if page loaded correctly or returned "Page not found"
-    return "Page not found" not in driver.page_source
+    # (evaluated in the browser: only a boolean travels back, not the whole page source)
+    try:
+        return bool(driver.execute_script(_PAGE_NOT_FOUND_JS, "Page not found"))
+    except WebDriverException:
+        return "Page not found" not in driver.page_source
 
 def is_empty_sharepoint_folder(driver):
     # Check if 'This folder is empty' is present
     try:
-        driver.find_element(By.XPATH, "//div[@data-automationid='list-empty-placeholder-title']")
+        driver.find_element(*_EMPTY_PLACEHOLDER)
         return True
     except NoSuchElementException:
         return False
 
-def click_download_button(driver):
+# Clicks the visible Download button, or opens the overflow ("More") menu when it is hidden.
+# Runs entirely in the browser: one WebDriver round trip instead of one per element lookup.
+_CLICK_DOWNLOAD_JS = """
+const btn = document.querySelector(arguments[0]);
+if (btn && btn.offsetParent !== null) { btn.click(); return "direct"; }
+const more = document.querySelector(arguments[1]);
+if (more) { more.click(); return "menu"; }
+return null;
+"""
+_CLICK_IF_PRESENT_JS = """
+const btn = document.querySelector(arguments[0]);
+if (btn) { btn.click(); return true; }
+return false;
+"""
+
+def click_download_button(driver, menu_timeout: float = 2.0):
+    from selenium.webdriver.support.ui import WebDriverWait
+
     # Try to click the visible Download button
     try:
-        download_button = driver.find_element(By.XPATH, "//button[@data-automationid='downloadCommand']")
-        download_button.click()
+        outcome = driver.execute_script(_CLICK_DOWNLOAD_JS, _DOWNLOAD_BTN_CSS, _MORE_BTN_CSS)
+    except Exception as e:
+        print(f"Failed to click Download button: {e}")
+        log.error("Failed to click Download button: %s", e)
+        return
+
+    if outcome == "direct":
         print("Download button clicked directly.")
         log.info("Download button clicked directly.")
-    except (NoSuchElementException, ElementNotInteractableException):
-        # If not visible, try through the overflow menu
-        print("Download button not visible, trying through menu...")
-        log.info("Download button not visible, trying through menu...")
-        try:
-            menu_button = driver.find_element(By.XPATH, "//button[contains(@aria-label, 'More') or contains(@data-automationid, 'more')]")
-            menu_button.click()
-            time.sleep(1)
-            
-            download_in_menu = driver.find_element(By.XPATH, "//button[@data-automationid='downloadCommand']")
-            download_in_menu.click()
-            print("Download button clicked from menu.")
-            log.info("Download button clicked from menu.")
-        except Exception as e:
-            print(f"Failed to click Download button: {e}")
-            log.error(f"Failed to click Download button: {e}")
+        return
+
+    if outcome != "menu":
+        print("Failed to click Download button: button and menu not found")
+        log.error("Failed to click Download button: button and menu not found")
+        return
+
+    # If not visible, try through the overflow menu (poll until the menu has rendered)
+    print("Download button not visible, trying through menu...")
+    log.info("Download button not visible, trying through menu...")
+    try:
+        WebDriverWait(driver, menu_timeout, poll_frequency=0.1).until(
+            lambda d: d.execute_script(_CLICK_IF_PRESENT_JS, _DOWNLOAD_BTN_CSS)
+        )
+        print("Download button clicked from menu.")
+        log.info("Download button clicked from menu.")
+    except TimeoutException:
+        print("Failed to click Download button: not found in menu")
+        log.error("Failed to click Download button: not found in menu")
+
+class _DownloadEventHandler(FileSystemEventHandler):
+    """Pushes (kind, path) tuples for every filesystem event in the download folder."""
+
+    def __init__(self, events: "queue.Queue[tuple[str, Path]]"):
+        super().__init__()
+        self.events = events
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.events.put(("created", Path(event.src_path)))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.events.put(("modified", Path(event.src_path)))
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.events.put(("deleted", Path(event.src_path)))
+            self.events.put(("created", Path(event.dest_path)))
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.events.put(("deleted", Path(event.src_path)))
 
 def wait_for_download(download_dir: Path | str,
                     stable_for: float = 8.0,
@@ -149,36 +257,116 @@ def wait_for_download(download_dir: Path | str,
     1) There must be no 'partial' files (typical browser extensions).
     2) There must be at least one .zip file, and its size must remain stable for `stable_for` seconds.
 
+    Uses filesystem events (watchdog) when available, so only the file that changed is
+    stat'ed; otherwise falls back to polling the folder every `poll` seconds.
+
     Returns the absolute path of the fully downloaded ZIP file (the most recent one).
     """
     download_dir = Path(download_dir)
-
-    def partials_present() -> bool:
-        for ext in partial_exts:
-            if any(download_dir.glob(f"*{ext}")):
-                return True
-        return False
-
-    def newest_zip() -> Path | None:
-        zips = list(download_dir.glob("*.zip"))
-        if not zips:
-            return None
-        # The most recent by mtime
-        return max(zips, key=lambda p: p.stat().st_mtime)
+    if not _HAS_WATCHDOG:
+        return _poll_for_download(download_dir, stable_for, poll, partial_exts)
+
+    partial_exts = tuple(ext.lower() for ext in partial_exts)
+    events: "queue.Queue[tuple[str, Path]]" = queue.Queue()
+    observer = Observer()
+    observer.schedule(_DownloadEventHandler(events), str(download_dir), recursive=False)
+    observer.start()
+    try:
+        # Initial state (files that existed before the watcher was started)
+        partials: set[Path] = set()
+        current_zip: Path | None = None
+        last_size = -1
+        last_change = time.monotonic()
+        for p in download_dir.iterdir():
+            if p.name.lower().endswith(partial_exts):
+                partials.add(p)
+            elif p.suffix.lower() == ".zip":
+                if current_zip is None or p.stat().st_mtime > current_zip.stat().st_mtime:
+                    current_zip = p
+        if current_zip:
+            last_size = current_zip.stat().st_size
+
+        while True:
+            # Only wait for the stability window when a ZIP is present and no partials remain;
+            # otherwise wake up every `poll` seconds so the wait stays interruptible.
+            if current_zip and not partials:
+                timeout = max(stable_for - (time.monotonic() - last_change), 0.0)
+            else:
+                timeout = poll
+
+            try:
+                kind, path = events.get(timeout=timeout)
+            except queue.Empty:
+                if current_zip and not partials:
+                    if current_zip.exists():
+                        return str(current_zip.resolve())
+                    current_zip = None
+                continue
+
+            name = path.name.lower()
+            if name.endswith(partial_exts):
+                if kind == "deleted":
+                    partials.discard(path)
+                else:
+                    partials.add(path)
+                last_change = time.monotonic()
+                continue
+
+            if path.suffix.lower() != ".zip":
+                continue
+
+            if kind == "deleted":
+                if path == current_zip:
+                    current_zip = None
+                continue
+
+            try:
+                size_now = path.stat().st_size
+            except OSError:
+                continue
+            # A newer ZIP appeared, or the current one grew: restart the stability window
+            if path != current_zip or size_now != last_size:
+                current_zip = path
+                last_size = size_now
+                last_change = time.monotonic()
+    finally:
+        observer.stop()
+        observer.join()
+
+def _poll_for_download(download_dir: Path,
+                       stable_for: float,
+                       poll: float,
+                       partial_exts) -> str:
+    """Polling fallback for `wait_for_download` when watchdog is not installed."""
+    partial_exts = tuple(ext.lower() for ext in partial_exts)
+
+    def scan() -> tuple[Path | None, bool]:
+        # One directory enumeration per tick: newest ZIP (by mtime) + whether partials exist
+        newest, newest_mtime, has_partial = None, -1.0, False
+        with os.scandir(download_dir) as it:
+            for e in it:
+                name = e.name.lower()
+                if name.endswith(partial_exts):
+                    has_partial = True
+                elif name.endswith(".zip"):
+                    mtime = e.stat().st_mtime
+                    if mtime > newest_mtime:
+                        newest, newest_mtime = Path(e.path), mtime
+        return newest, has_partial
 
     # Wait for a ZIP to appear and the partials to disappear
     while True:
-        nz = newest_zip()
-        if nz and not partials_present():
+        nz, has_partial = scan()
+        if nz and not has_partial:
             # We check size stability
             last_size = nz.stat().st_size
             last_change = time.time()
             while True:
                 time.sleep(poll)
+                nz_now, has_partial = scan()
                 # If partials appear again, we restart the external cycle
-                if partials_present():
+                if has_partial:
                     break
-                nz_now = newest_zip()
                 # If a newer ZIP appeared, we switch to that one
                 if nz_now and nz_now != nz:
                     nz = nz_now
@@ -210,20 +398,74 @@ def ensure_unique_path(path: Path | str) -> Path:
             return candidate
         n += 1
 
+# Constant memory per member copy, regardless of member size
+_COPY_CHUNK_SIZE = 1 << 20  # 1 MiB
+_ZIP_LOCAL_HEADER_SIZE = 30
+_ZIP_LOCAL_HEADER_SIG = b"PK\x03\x04"
+_ZIP_FLAG_ENCRYPTED = 0x1
+
+def _copy_member_raw(raw_in, info: zipfile.ZipInfo, zout: zipfile.ZipFile) -> None:
+    """
+    Appends member `info` to `zout` copying its compressed bytes as-is (no inflate/deflate).
+    `raw_in` is the incoming ZIP opened as a plain binary file.
+
+    Relies on ZipFile internals (CPython's own append path uses them the same way):
+    `fp`, `start_dir` (where the central directory gets written on close), `filelist`,
+    `NameToInfo` and `_didModify`.
+    """
+    # Locate the compressed data right after the member's local header
+    raw_in.seek(info.header_offset)
+    header = raw_in.read(_ZIP_LOCAL_HEADER_SIZE)
+    if len(header) != _ZIP_LOCAL_HEADER_SIZE or header[:4] != _ZIP_LOCAL_HEADER_SIG:
+        raise zipfile.BadZipFile(f"Bad local header for member {info.filename!r}")
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    raw_in.seek(info.header_offset + _ZIP_LOCAL_HEADER_SIZE + name_len + extra_len)
+
+    # Same CRC/sizes as the source, so the header can be written up front
+    new_info = zipfile.ZipInfo(filename=info.filename, date_time=info.date_time)
+    new_info.compress_type = info.compress_type
+    new_info.external_attr = info.external_attr
+    new_info.CRC = info.CRC
+    new_info.compress_size = info.compress_size
+    new_info.file_size = info.file_size
+
+    # The data below overwrites the old central directory: flag the archive as modified
+    # first, so close() always writes one back. start_dir only moves once the member is
+    # complete, so after a failed copy the directory overwrites (and truncates) the
+    # partial bytes and the existing members stay readable.
+    zout._didModify = True
+    zout.fp.seek(zout.start_dir)
+    new_info.header_offset = zout.fp.tell()
+    zout.fp.write(new_info.FileHeader())
+
+    remaining = info.compress_size
+    while remaining:
+        chunk = raw_in.read(min(remaining, _COPY_CHUNK_SIZE))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated data for member {info.filename!r}")
+        zout.fp.write(chunk)
+        remaining -= len(chunk)
+
+    # Register the member so the central directory is rewritten on close
+    zout.start_dir = zout.fp.tell()
+    zout.filelist.append(new_info)
+    zout.NameToInfo[new_info.filename] = new_info
+
 def merge_zip_into_existing(existing_zip_path: str, incoming_zip_path: str) -> dict:
     """
     Merges the contents of incoming_zip_path into existing_zip_path.
     - Skips duplicate directories and files (same internal name).
     - Maintains the internal folder structure.
+    - DEFLATE members are copied with their compressed bytes (no zlib round trip).
     - Returns a summary with counters.
     """
     added = 0
     skipped = 0
 
-    with zipfile.ZipFile(existing_zip_path, mode="a", compression=zipfile.ZIP_DEFLATED) as zout:
+    with zipfile.ZipFile(existing_zip_path, mode="a", compression=zipfile.ZIP_STORED, allowZip64=True) as zout:
         existing_names = set(zout.namelist())
 
-        with zipfile.ZipFile(incoming_zip_path, mode="r") as zin:
+        with zipfile.ZipFile(incoming_zip_path, mode="r") as zin, open(incoming_zip_path, "rb") as raw_in:
             for info in zin.infolist():
                 # Skip directory entries
                 if info.is_dir():
@@ -236,104 +478,186 @@ def merge_zip_into_existing(existing_zip_path: str, incoming_zip_path: str) -> d
                     skipped += 1
                     continue
 
-                # Copy content (stream) and respect basic timestamps
-                with zin.open(info, "r") as src:
-                    data = src.read()
-
-                new_info = zipfile.ZipInfo(filename=name_in_zip, date_time=info.date_time)
-                new_info.compress_type = zipfile.ZIP_DEFLATED
-                # Optional: preserve unix permissions if you are interested
-                new_info.external_attr = info.external_attr
-
-                zout.writestr(new_info, data)
+                if info.compress_type == zipfile.ZIP_DEFLATED and not info.flag_bits & _ZIP_FLAG_ENCRYPTED:
+                    # Already compressed: copy the raw bytes
+                    _copy_member_raw(raw_in, info, zout)
+                else:
+                    new_info = zipfile.ZipInfo(filename=name_in_zip, date_time=info.date_time)
+                    # Keep the member's original compression (stored members are not deflated again)
+                    new_info.compress_type = info.compress_type
+                    # Optional: preserve unix permissions if you are interested
+                    new_info.external_attr = info.external_attr
+                    new_info.file_size = info.file_size
+
+                    # Copy content (stream) without buffering the whole member in memory
+                    with zin.open(info, "r") as src, zout.open(new_info, "w", force_zip64=True) as dst:
+                        shutil.copyfileobj(src, dst, length=_COPY_CHUNK_SIZE)
                 existing_names.add(name_in_zip)
                 added += 1
 
     return {"added": added, "skipped": skipped}
 
-def download_from_sharepoint(url, folder_name):
-    # Temp path for downloading (shared for all iterations)
-    # base_download_path = os.path.join(current_dir, "downloads", "temp")
-    run_base = _get_writable_base_dir()
-    base_download_path = str((run_base / "downloads" / "temp").resolve())
-    os.makedirs(base_download_path, exist_ok=True)
-
-    # Setup WebDriver
-    driver = setup_driver(base_download_path)
+# Serializes merges into the same final ZIP when downloads run on several threads
+_merge_lock = threading.Lock()
 
+def _allow_downloads(driver, download_path: str) -> None:
     # (Optional but recommended in modern headless Chrome/Edge)
     # Allow headless downloads:
     try:
         driver.execute_cdp_cmd("Page.setDownloadBehavior", {
             "behavior": "allow",
-            "downloadPath": base_download_path
+            "downloadPath": download_path
         })
     except Exception:
         pass
 
-    driver.get(url)
-    time.sleep(5)
+def download_from_sharepoint(url, folder_name, driver=None, download_dir: Path | str | None = None):
+    """
+    Downloads the SharePoint folder at `url` into downloads/<folder_name>/Related Documents.zip.
+    - driver / download_dir: an already-open browser to reuse (left open) and the folder it
+      downloads into; when omitted a new browser is started on downloads/temp and closed at the end.
+    """
+    # Temp path for downloading (shared for all iterations)
+    # base_download_path = os.path.join(current_dir, "downloads", "temp")
+    run_base = _get_writable_base_dir()
+    if download_dir is None:
+        download_dir = run_base / "downloads" / "temp"
+    base_download_path = str(Path(download_dir).resolve())
+    Path(base_download_path).mkdir(parents=True, exist_ok=True)
+
+    # Setup WebDriver (only when the caller did not provide one)
+    owns_driver = driver is None
+    if owns_driver:
+        driver = setup_driver(base_download_path)
+    _allow_downloads(driver, base_download_path)
 
-    log.info(f"{folder_name} - Accessing SharePoint URL: {url}")
+    try:
+        driver.get(url)
+        _wait_for_folder_page(driver)
 
-    if not is_valid_url(driver):
-        print(f"Invalid URL or 'Page not found': {url}")
-        log.error(f"Invalid URL or 'Page not found': {url}")
-        driver.quit()
-        return
+        log.info("%s - Accessing SharePoint URL: %s", folder_name, url)
 
-    if is_empty_sharepoint_folder(driver):
-        print(f"No files in SharePoint folder: {folder_name}")
-        log.info(f"No files in SharePoint folder: {folder_name}")
-        driver.quit()
-        return
+        if not is_valid_url(driver):
+            print(f"Invalid URL or 'Page not found': {url}")
+            log.error("Invalid URL or 'Page not found': %s", url)
+            return
 
-    # Clean residue from previous downloads in temp (optional)
-    for p in glob.glob(os.path.join(base_download_path, "*")):
-        try:
-            os.remove(p)
-        except OSError:
-            pass
+        if is_empty_sharepoint_folder(driver):
+            print(f"No files in SharePoint folder: {folder_name}")
+            log.info("No files in SharePoint folder: %s", folder_name)
+            return
 
-    # Trigger download
-    click_download_button(driver)
+        # Clean residue from previous downloads in temp (optional)
+        _clear_folder(base_download_path)
 
-    # Wait indefinitely until the ZIP is complete
-    try:
+        # Trigger download
+        click_download_button(driver)
+
+        # Wait indefinitely until the ZIP is complete
         downloaded_file = wait_for_download(base_download_path, stable_for=8.0, poll=1.0)
 
         if downloaded_file:
             # Final folder and destination zip
             # final_folder = os.path.join(current_dir, "downloads", folder_name)
             final_folder = str((run_base / "downloads" / folder_name).resolve())
-            os.makedirs(final_folder, exist_ok=True)
+            Path(final_folder).mkdir(parents=True, exist_ok=True)
 
             desired_path = os.path.join(final_folder, "Related Documents.zip")
 
-            if os.path.exists(desired_path):
+            try:
+                # Atomic exclusive create: fails if the ZIP is already there (no exists/rename race)
+                os.link(downloaded_file, desired_path)
+                created = True
+            except FileExistsError:
+                created = False
+            except OSError:
+                # Hard links not supported (e.g. FAT/network drive) -> check, then move
+                created = not os.path.exists(desired_path)
+                if created:
+                    os.replace(downloaded_file, desired_path)
+
+            if created:
+                print(f"Download complete and moved to: {desired_path}")
+                log.info("Download complete and moved to: %s", desired_path)
+            else:
                 # Zip already exists -> merge contents and delete the new one
-                summary = merge_zip_into_existing(desired_path, downloaded_file)
+                with _merge_lock:
+                    summary = merge_zip_into_existing(desired_path, downloaded_file)
                 msg = (f"Merged into existing ZIP: {desired_path} | "
                     f"Added: {summary['added']} | Skipped duplicates: {summary['skipped']}")
                 print(msg)
                 log.info(msg)
-                try:
-                    os.remove(downloaded_file)
-                except OSError:
-                    pass
-            else:
-                # Does not exist -> move/rename
-                os.replace(downloaded_file, desired_path)
-                print(f"Download complete and moved to: {desired_path}")
-                log.info(f"Download complete and moved to: {desired_path}")
+
+            # Drop the temp copy (no-op if it was already moved)
+            try:
+                os.remove(downloaded_file)
+            except OSError:
+                pass
         else:
             # In theory, we shouldn't get here because we're waiting indefinitely,
             # but we're leaving it for safety.
             print(f"Download did not complete for: {folder_name}")
-            log.error(f"Download did not complete for: {folder_name}")
+            log.error("Download did not complete for: %s", folder_name)
     finally:
-        driver.quit()
-        
+        if owns_driver:
+            driver.quit()
+
+_WINDOWS_INVALID_CHARS = re.compile(r'[<>:"|?*]')
+
+def _zip_member_target(dest_folder: Path, filename: str) -> Path | None:
+    """
+    Where `ZipFile.extract` would write `filename`: drive, absolute and '.'/'..' parts
+    dropped (on Windows, characters invalid in file names become '_'). None if nothing is left.
+    """
+    if os.name == "nt":
+        filename = filename.replace("\\", "/")
+    parts = [p for p in os.path.splitdrive(filename)[1].split("/") if p not in ("", ".", "..")]
+    if os.name == "nt":
+        parts = [_WINDOWS_INVALID_CHARS.sub("_", p).rstrip(" .") or "_" for p in parts]
+    return dest_folder.joinpath(*parts) if parts else None
+
+def _extract_zip_parallel(zip_path: Path, dest_folder: Path, max_workers: int | None = None) -> None:
+    """
+    Extracts `zip_path` into `dest_folder` spreading the members over threads
+    (zlib releases the GIL). Each thread uses its own ZipFile handle, since
+    ZipFile objects are not thread-safe. Every folder is created up front, on this
+    thread: `ZipFile.extract` creating parents from several threads races on makedirs
+    ([Errno 17] File exists), so the workers only stream members into files.
+    """
+    with zipfile.ZipFile(zip_path, "r") as z:
+        infos = z.infolist()
+
+    files = []
+    folders = set()
+    for info in infos:
+        target = _zip_member_target(dest_folder, info.filename)
+        if target is None:
+            continue
+        if info.is_dir():
+            folders.add(target)  # keeps empty folders
+        else:
+            folders.add(target.parent)
+            files.append((info, target))
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
+    if not files:
+        return
+
+    files.sort(key=lambda item: item[0].file_size, reverse=True)
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(files)))
+    # Largest-first round robin => roughly equal bytes per worker
+    groups = [files[i::workers] for i in range(workers)]
+
+    def _extract_group(group):
+        with zipfile.ZipFile(zip_path, "r") as zg:
+            for info, target in group:
+                with zg.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst, _COPY_CHUNK_SIZE)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() so exceptions from workers are raised here
+        list(executor.map(_extract_group, groups))
+
 def extract_related_zip(folder_name: str, remove_zip: bool = True) -> bool:
     """
     Extracts 'Related Documents.zip' to the same folder and (optional) deletes the ZIP file.
@@ -344,16 +668,15 @@ def extract_related_zip(folder_name: str, remove_zip: bool = True) -> bool:
     zip_path = Path(dest_folder / "Related Documents.zip")
 
     if not zip_path.exists():
-        log.info(f"No ZIP to extract for {folder_name}: {zip_path} not found")
+        log.info("No ZIP to extract for %s: %s not found", folder_name, zip_path)
         return False
 
     try:
-        with zipfile.ZipFile(zip_path, "r") as z:
-            z.extractall(dest_folder)
+        _extract_zip_parallel(zip_path, dest_folder)
         if remove_zip:
             zip_path.unlink(missing_ok=True)
-        log.info(f"Extracted ZIP for {folder_name} to {dest_folder} (removed_zip={remove_zip})")
+        log.info("Extracted ZIP for %s to %s (removed_zip=%s)", folder_name, dest_folder, remove_zip)
         return True
     except Exception as e:
-        log.error(f"Failed to extract ZIP for {folder_name}: {e}")
+        log.error("Failed to extract ZIP for %s: %s", folder_name, e)
         return False
\ No newline at end of file
@@ -97,12 +97,12 @@ def make_brave_driver(download_dir: Path, brave_path: str = DEFAULT_BRAVE) -> we
     try:
         # first try: webdriver-manager (controlled driver resolution)
         if _HAS_WDM and ChromeDriverManager and major.isdigit():
-            log.info(f"[Browser Resolver] Trying webdriver-manager for Brave Chromium major version {major}")
+            log.info("[Browser Resolver] Trying webdriver-manager for Brave Chromium major version %s", major)
             
             # Download the ChromeDriver that corresponds to the Chromium major (e.g., '142')
             driver_path = ChromeDriverManager(driver_version=major).install()
             
-            log.info(f"[Browser Resolver] ✔ Driver resolved using webdriver-manager → {driver_path}")
+            log.info("[Browser Resolver] ✔ Driver resolved using webdriver-manager → %s", driver_path)
             print(f"[Browser Resolver] ✔ Driver resolved using webdriver-manager (version {major})")
             return webdriver.Chrome(service=Service(driver_path), options=opts)
         else:
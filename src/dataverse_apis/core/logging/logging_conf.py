@@ -1,14 +1,21 @@
 # core/logging_conf.py
 import logging
+import logging.handlers
+import atexit
+import queue
 from pathlib import Path
-from datetime import datetime
+import time
 import os, sys
+import threading
 from typing import Optional
 
 from ..services.runtime_paths import resolve_runtime_path
 
 _CONFIGURED = False
 _current_log_file: Optional[Path] = None
+_INIT_LOCK = threading.Lock()
+# Background thread that writes the queued records to the file/console handlers
+_listener: Optional[logging.handlers.QueueListener] = None
 
 APP_FALLBACK_NAME = "DataFlipper" # Fallback if not provided in setup_logging
 
@@ -50,12 +57,12 @@ def _writable_logs_dir(app_name: str,
         candidate = exe_dir / "logs"
         try:
             candidate.mkdir(parents=True, exist_ok=True)
-            # writing test
+            # writing test (create + delete in one try, no exists() pre-check)
             test = candidate / ".write_test"
             test.write_text("ok", encoding="utf-8")
-            test.unlink(missing_ok=True)
+            test.unlink()
             return candidate
-        except Exception:
+        except OSError:
             pass
 
         # 3) %LOCALAPPDATA%\{app}\logs
@@ -108,15 +115,25 @@ def setup_logging(app_name: str = APP_FALLBACK_NAME,
                   logs_dir: Path | None = None) -> Path:
     """
     Configures file + console logging. Returns the path to the .log file.
-    Only configured once per process.
+    Only configured once per process (thread-safe).
     """
-    global _CONFIGURED, _current_log_file
     if _CONFIGURED:
         return _current_log_file or Path()
 
+    # Double-checked: two threads racing here must not both attach handlers
+    with _INIT_LOCK:
+        if _CONFIGURED:
+            return _current_log_file or Path()
+        return _configure_root(app_name, level, logs_dir)
+
+def _configure_root(app_name: str,
+                    level: str | None,
+                    logs_dir: Path | None) -> Path:
+    """Body of `setup_logging`; must run under _INIT_LOCK."""
+    global _CONFIGURED, _current_log_file, _listener
     lvl = (level or os.getenv("LOG_LEVEL") or "INFO").upper()
     target_dir = _writable_logs_dir(app_name or APP_FALLBACK_NAME, logs_dir)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ts = time.strftime("%Y%m%d_%H%M%S")  # local time, like datetime.now()
     log_file = target_dir / f"{app_name}_{ts}.log"
 
     fmt = logging.Formatter(
@@ -133,17 +150,29 @@ def setup_logging(app_name: str = APP_FALLBACK_NAME,
     console_h = logging.StreamHandler()
     console_h.setFormatter(fmt)
 
-    root.addHandler(file_h)
-    root.addHandler(console_h)
+    # Callers only enqueue the record; file/console IO happens on the listener thread
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, file_h, console_h, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener)
 
     _CONFIGURED = True
     _current_log_file = log_file
-    root.info(f"Logging initialized → {log_file}")
+    root.info("Logging initialized → %s", log_file)
     return log_file
 
+def _stop_listener() -> None:
+    """Drains pending records and stops the listener thread (registered with atexit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 def get_logger(name: str | None = None) -> logging.Logger:
     """_summary_
         Get one logger per module/area.
         Recommended usage: get_logger(__name__)
+        Prefer `logger.debug('x=%s', x)` over `logger.debug(f'x={x}')`; the former defers formatting.
     """
     return logging.getLogger(name or "app")
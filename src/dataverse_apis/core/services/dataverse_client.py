@@ -1,32 +1,137 @@
-import os
+from __future__ import annotations
+import re
+import json
+import uuid
 import requests
+from dataclasses import dataclass
+from typing import Iterator
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from functools import lru_cache
 from ..auth.msal_auth import get_access_token_with_msal_default
-from ..auth.msal_auth import get_access_token_with_msal_default
-from dotenv import load_dotenv
-
-# Environment variables
-# ICPS URL
-api_url = os.getenv("DATAVERSE_BASE_URI")
-api_version = os.getenv("API_VERSION")
-webapi_url = f"{api_url}/api/data/v{api_version}"
-
-
-# def call_dataverse(endpoint: str, method: str = "GET", data: dict = None):
-#     token = get_access_token_with_msal_default() #using the default methodL of MSAL
-#     headers = {
-#         "Authorization": f"Bearer {token}",
-#         "Accept": "application/json",
-#         "Content-Type": "application/json",
-#         "OData-MaxVersion": "4.0",
-#         "OData-Version": "4.0"
-#     }
-    
-#     url = f"{webapi_url}/{endpoint}"
-#     response = requests.request(method.upper(), url, headers=headers, json=data)
-#     response.raise_for_status()
-#     return response.json() if response.content else {"status": "success"}
-
-def call_dataverse(endpoint: str, method: str = "GET", data: dict = None, headers_extra: dict = None):
+from .env_loader import get_env_variable_value
+from .rate_limiter import TokenBucket
+
+# Optional: incremental JSON parsing for paged reads
+try:
+    import ijson
+    _HAS_IJSON = True
+except Exception:
+    ijson = None
+    _HAS_IJSON = False
+
+# Environment variables (resolved on first use, so a .env loaded after import still applies)
+@lru_cache(maxsize=1)
+def _url_prefix() -> str:
+    """'<DATAVERSE_BASE_URI>/api/data/v<API_VERSION>/' (ICPS URL)."""
+    api_url = get_env_variable_value("DATAVERSE_BASE_URI", required=True)
+    api_version = get_env_variable_value("API_VERSION", required=True)
+    return f"{api_url}/api/data/v{api_version}/"
+
+# Sent with every request (set once on the session)
+_STATIC_HEADERS = {
+    "Accept": "application/json",
+    "Content-Type": "application/json",
+    "OData-MaxVersion": "4.0",
+    "OData-Version": "4.0"
+}
+
+SUPPORTED_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (3.05, 30)
+# $batch requests carry many operations: allow a longer read
+BATCH_TIMEOUT = (3.05, 120)
+# Retried by the session adapter; 429/503 are reported with their Retry-After if still failing
+RETRY_STATUSES = (429, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+# Kept-alive connections to Dataverse shared by all threads (callers block for a free one
+# rather than opening a throwaway connection when more threads than this are calling)
+POOL_MAXSIZE = 20
+# Verbs that may be re-sent after a gateway error or a dropped read (the first attempt may
+# already have been applied; re-sending a POST would create a second record)
+IDEMPOTENT_METHODS = frozenset({"GET", "PUT"})
+
+class _DataverseRetry(Retry):
+    """Retry that re-sends every verb on 429/503 (rejected, never applied) but only
+    idempotent verbs on gateway/read errors."""
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code in THROTTLE_STATUSES:
+            method = "GET"  # throttled before being processed: safe for POST/PATCH/DELETE too
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and response.status == 429:
+            # Every throttled attempt (not only the last one) slows the shared bucket down
+            get_rate_limiter().slow_down(retry_after=response.headers.get("Retry-After"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+def _build_session() -> requests.Session:
+    """Session shared by every Dataverse call: connection pooling + HTTP keep-alive."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=1,  # a single host
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=True,
+        # Throttling (429/503) is retried for every verb, gateway errors (502/504) only for
+        # IDEMPOTENT_METHODS, waiting what the service asks for in Retry-After.
+        # raise_on_status=False hands the last response back so call_dataverse can report
+        # it (with Retry-After).
+        max_retries=_DataverseRetry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ),
+    ))
+    # Static headers; Authorization is set per call because the token rotates
+    session.headers.update(_STATIC_HEADERS)
+    return session
+
+_session = _build_session()
+
+def get_session() -> requests.Session:
+    """Returns the shared Dataverse session (handy to mount adapters or mocks in tests)."""
+    return _session
+
+
+# Dataverse service protection allows 6000 requests / 5 min per user (~20/s)
+DEFAULT_MAX_REQUESTS_PER_SEC = 20
+
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> TokenBucket:
+    """Token bucket shared by every Dataverse call (DATAVERSE_MAX_RPS overrides the rate)."""
+    rps = float(get_env_variable_value("DATAVERSE_MAX_RPS", DEFAULT_MAX_REQUESTS_PER_SEC))
+    return TokenBucket(capacity=rps, refill_per_sec=rps)
+
+def _request(method: str, url: str, **kwargs) -> requests.Response:
+    """`_session.request` paced by the rate limiter, which learns from the response headers."""
+    limiter = get_rate_limiter()
+    limiter.acquire()
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    response = _session.request(method, url, **kwargs)
+    limiter.observe(response.headers)
+    if response.status_code < 400:
+        limiter.record_success()  # 429s are reported by _DataverseRetry, attempt by attempt
+    return response
+
+def _send(method: str, full_url: str, headers: dict, data: dict | None,
+          data_bytes: bytes | None = None) -> requests.Response:
+    has_body = method in ("POST", "PUT", "PATCH")
+    if data_bytes is not None and has_body:
+        # Already-serialized JSON (Content-Type comes from the session headers)
+        return _request(method, full_url, headers=headers, data=data_bytes)
+    return _request(
+        method,
+        full_url,
+        headers=headers,
+        json=data if has_body else None,
+    )
+
+def call_dataverse(endpoint: str, method: str = "GET", data: dict = None, headers_extra: dict = None,
+                   data_bytes: bytes | None = None):
     """
     Makes a request to the specified Dataverse endpoint.
 
@@ -35,41 +140,34 @@ def call_dataverse(endpoint: str, method: str = "GET", data: dict = None, header
     - method: 'GET', 'POST', 'PUT', 'DELETE'
     - data: dictionary with the body (for POST or PUT)
     - headers_extra: optional additional headers
+    - data_bytes: body already encoded as JSON bytes (e.g. with orjson); wins over `data`
 
     Returns:
     - dict with the JSON response if successful
     """
     access_token = get_access_token_with_msal_default() #using the default methodL of MSAL
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "OData-MaxVersion": "4.0",
-        "OData-Version": "4.0"
-    }
+    headers = {"Authorization": f"Bearer {access_token}"}
 
     # Allow additional headers if needed
     if headers_extra:
-        headers.update(headers_extra)
+        headers |= headers_extra
 
-    full_url = f"{webapi_url}/{endpoint}"
+    full_url = _url_prefix() + endpoint
 
     # Mapping methods to request functions
-    method = method.upper()
+    if not method.isupper():
+        method = method.upper()
     response = None
     try:
-        if method == "GET":
-            response = requests.get(full_url, headers=headers)
-        elif method == "POST":
-            response = requests.post(full_url, headers=headers, json=data)
-        elif method == "PUT":
-            response = requests.put(full_url, headers=headers, json=data)
-        elif method == "PATCH":
-            response = requests.patch(full_url, headers=headers, json=data)
-        elif method == "DELETE":
-            response = requests.delete(full_url, headers=headers)
-        else:
+        if method not in SUPPORTED_METHODS:
             raise ValueError(f"HTTP method not supported: {method}")
+
+        response = _send(method, full_url, headers, data, data_bytes)
+
+        # Token rejected before its expiry (revoked/rotated): refresh it and retry once
+        if response.status_code == 401:
+            headers["Authorization"] = f"Bearer {get_access_token_with_msal_default(force_refresh=True)}"
+            response = _send(method, full_url, headers, data, data_bytes)
         
         response.raise_for_status()
         # return response.json() if response.content else {"status": "success", "code": response.status_code}
@@ -99,7 +197,6 @@ def call_dataverse(endpoint: str, method: str = "GET", data: dict = None, header
             error_payload = response.json()
         except ValueError:
             error_payload = response.text
-            error_payload = response.text
 
         # --- SPECIAL CASE: EXPIRED TOKEN / 401---
         if status == 401:
@@ -110,6 +207,18 @@ def call_dataverse(endpoint: str, method: str = "GET", data: dict = None, header
                 "details": error_payload,
             }
 
+        # --- THROTTLED / UNAVAILABLE (429/503): retries exhausted, tell the caller when to come back ---
+        if status in THROTTLE_STATUSES:
+            return {
+                "status": "error",
+                "status_code": status,
+                "error": f"HTTP {status}: Dataverse is throttling or unavailable",
+                "details": {
+                    "retry_after": response.headers.get("Retry-After"),
+                    "body": error_payload,
+                },
+            }
+
         # Other HTTP errors
         return {
             "status": "error",
@@ -125,4 +234,275 @@ def call_dataverse(endpoint: str, method: str = "GET", data: dict = None, header
             "status_code": None,
             "error": f"Unexpected error: {e}",
             "details": None,
-        }
\ No newline at end of file
+        }
+
+# ---------- Paged reads (server-driven paging) ----------
+
+def _iter_page_items(response: requests.Response) -> Iterator[dict | str]:
+    """
+    Yields the records of one page and, last, the `@odata.nextLink` (str) if present.
+    With ijson the body is parsed while it streams in; otherwise it is parsed at once.
+    """
+    if not _HAS_IJSON:
+        payload = response.json()
+        yield from payload.get("value", [])
+        if payload.get("@odata.nextLink"):
+            yield payload["@odata.nextLink"]
+        return
+
+    response.raw.decode_content = True  # let urllib3 undo gzip/deflate
+    next_link = None
+    builder = None
+    for prefix, event, value in ijson.parse(response.raw, use_float=True):
+        if prefix == "@odata.nextLink":
+            next_link = value
+        elif prefix == "value.item" and event == "start_map":
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+        elif builder is not None:
+            builder.event(event, value)
+            if prefix == "value.item" and event == "end_map":
+                yield builder.value
+                builder = None
+    if next_link:
+        yield next_link
+
+def call_dataverse_paged(endpoint: str, page_size: int = 500, headers_extra: dict | None = None) -> Iterator[dict]:
+    """
+    Iterates over every record of a list endpoint (e.g. 'annotations?$filter=...'),
+    asking for `page_size` records per page and following `@odata.nextLink`.
+    Records are yielded as each page arrives, so memory stays bounded by one page.
+
+    Raises requests.HTTPError if a page request fails (a partial listing is never
+    returned silently); a 401 first refreshes the token and retries that page once. Use `call_dataverse` for single-record / small reads.
+    """
+    headers = {"Prefer": f"odata.maxpagesize={page_size}"}
+    if headers_extra:
+        headers |= headers_extra
+
+    url: str | None = _url_prefix() + endpoint
+    while url:
+        headers["Authorization"] = f"Bearer {get_access_token_with_msal_default()}"
+        response = _request("GET", url, headers=headers, stream=True)
+        # Token rejected before its expiry (revoked/rotated): refresh it and retry the page once
+        if response.status_code == 401:
+            response.close()
+            headers["Authorization"] = f"Bearer {get_access_token_with_msal_default(force_refresh=True)}"
+            response = _request("GET", url, headers=headers, stream=True)
+        with response:
+            response.raise_for_status()
+            url = None
+            for item in _iter_page_items(response):
+                if isinstance(item, str):
+                    url = item  # absolute nextLink, used as-is
+                else:
+                    yield item
+
+
+# ---------- $batch (several operations in one HTTP round trip) ----------
+
+@dataclass
+class BatchOperation:
+    """One request inside a Dataverse $batch call (endpoint is relative, e.g. 'accounts(<id>)')."""
+    method: str
+    endpoint: str
+    data: dict | None = None
+    headers: dict | None = None
+
+def _batch_part_result(status: int, payload) -> dict:
+    """Shapes one $batch part like a `call_dataverse` result."""
+    if status < 400:
+        return {
+            "status": "success",
+            "status_code": status,
+            **(payload if isinstance(payload, dict) else {}),
+        }
+    return {
+        "status": "error",
+        "status_code": status,
+        "error": "401 Unauthorized: access token expired or invalid" if status == 401 else f"HTTP {status}",
+        "details": payload,
+    }
+
+def _parse_batch_groups(text: str, boundary: str) -> list[list[dict]]:
+    """
+    Splits a multipart/mixed $batch response into per-operation results, grouped by
+    top-level part: one list per changeset, one single-item list per standalone request.
+    """
+    groups: list[list[dict]] = []
+    for part in text.split(f"--{boundary}")[1:]:
+        if part.startswith("--"):  # closing delimiter
+            break
+        part_headers, _, part_body = part.strip("\n").partition("\n\n")
+        inner = re.search(r"boundary=([^\s;]+)", part_headers, re.IGNORECASE)
+        if inner and "multipart/mixed" in part_headers.lower():
+            groups.append([r for group in _parse_batch_groups(part_body, inner.group(1)) for r in group])
+            continue
+
+        # The part body is a full HTTP response: status line, headers, blank line, body
+        status_line, _, rest = part_body.partition("\n")
+        _, _, http_body = rest.partition("\n\n")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            continue
+        http_body = http_body.strip()
+        try:
+            payload = json.loads(http_body) if http_body else {}
+        except ValueError:
+            payload = {"raw": http_body}
+        groups.append([_batch_part_result(status, payload)])
+    return groups
+
+def _parse_batch_parts(text: str, boundary: str) -> list[dict]:
+    """Splits a multipart/mixed $batch response (changesets included) into per-operation results."""
+    return [r for group in _parse_batch_groups(text, boundary) for r in group]
+
+def _batch_request_lines(op: BatchOperation) -> list[str]:
+    lines = [f"{op.method.upper()} {_url_prefix()}{op.endpoint} HTTP/1.1"]
+    if op.data is not None:
+        lines.append("Content-Type: application/json")
+    for key, value in (op.headers or {}).items():
+        lines.append(f"{key}: {value}")
+    lines.append("")
+    lines.append(json.dumps(op.data) if op.data is not None else "")
+    return lines
+
+def _batch_body(batch_id: str, changesets: list[list[BatchOperation]], singles: list[BatchOperation]) -> str:
+    """multipart/mixed body: each changeset (all-or-nothing) first, then the standalone requests."""
+    lines: list[str] = []
+    content_id = 0
+    for ops in changesets:
+        changeset_id = f"changeset_{uuid.uuid4()}"
+        lines += [f"--{batch_id}", f"Content-Type: multipart/mixed; boundary={changeset_id}", ""]
+        for op in ops:
+            content_id += 1
+            lines += [
+                f"--{changeset_id}",
+                "Content-Type: application/http",
+                "Content-Transfer-Encoding: binary",
+                f"Content-ID: {content_id}",
+                "",
+                *_batch_request_lines(op),
+            ]
+        lines.append(f"--{changeset_id}--")
+    for op in singles:
+        lines += [
+            f"--{batch_id}",
+            "Content-Type: application/http",
+            "Content-Transfer-Encoding: binary",
+            "",
+            *_batch_request_lines(op),
+        ]
+    lines.append(f"--{batch_id}--")
+    return "\r\n".join(lines) + "\r\n"
+
+def _post_batch(changesets: list[list[BatchOperation]], singles: list[BatchOperation]) -> dict:
+    """
+    POSTs one $batch request. Returns {"status": "success", "status_code", "groups"} with
+    the parsed response groups (see `_parse_batch_groups`), or a `call_dataverse`-like
+    error dict with "groups": [] when the batch as a whole failed.
+
+    Sent with `odata.continue-on-error`: a failed part does not stop the ones after it,
+    so every part normally gets a response. Groups still come back in request order;
+    parts after the last group returned never ran.
+    """
+    batch_id = f"batch_{uuid.uuid4()}"
+    body = _batch_body(batch_id, changesets, singles).encode("utf-8")
+
+    headers = {
+        "Authorization": f"Bearer {get_access_token_with_msal_default()}",
+        "Content-Type": f"multipart/mixed; boundary={batch_id}",
+        "Prefer": "odata.continue-on-error",
+    }
+    full_url = _url_prefix() + "$batch"
+
+    try:
+        response = _request("POST", full_url, headers=headers, data=body, timeout=BATCH_TIMEOUT)
+        if response.status_code == 401:
+            headers["Authorization"] = f"Bearer {get_access_token_with_msal_default(force_refresh=True)}"
+            response = _request("POST", full_url, headers=headers, data=body, timeout=BATCH_TIMEOUT)
+
+        if response.status_code >= 400:
+            try:
+                error_payload = response.json()
+            except ValueError:
+                error_payload = response.text
+            return {**_batch_part_result(response.status_code, error_payload), "groups": []}
+
+        match = re.search(r"boundary=([^\s;]+)", response.headers.get("Content-Type", ""), re.IGNORECASE)
+        if not match:
+            return {
+                "status": "error",
+                "status_code": response.status_code,
+                "error": "Unexpected $batch response (no multipart boundary)",
+                "details": response.text,
+                "groups": [],
+            }
+        groups = _parse_batch_groups(response.text.replace("\r\n", "\n"), match.group(1))
+    except Exception as e:
+        # Unexpected errors (network, etc.)
+        return {
+            "status": "error",
+            "status_code": None,
+            "error": f"Unexpected error: {e}",
+            "details": None,
+            "groups": [],
+        }
+    return {"status": "success", "status_code": response.status_code, "groups": groups}
+
+def _with_first_error(envelope: dict, responses: list[dict]) -> dict:
+    """Lifts the first failed operation (if any) to the envelope's status/error fields."""
+    first_error = next((r for r in responses if r["status"] == "error"), None)
+    if first_error:
+        return {
+            **envelope,
+            "status": "error",
+            "status_code": first_error["status_code"],
+            "error": first_error["error"],
+            "details": first_error.get("details"),
+        }
+    return envelope
+
+def call_dataverse_batch(operations: list[BatchOperation], atomic: bool = True) -> dict:
+    """
+    Sends several operations to `$batch` in a single HTTP request.
+
+    - atomic=True puts the write operations in one changeset: Dataverse applies all
+      of them or none (on failure only the failing part is returned).
+    - GET operations are always sent outside the changeset.
+
+    Returns:
+    - dict with status/status_code/error like `call_dataverse`, plus "responses":
+      one `call_dataverse`-like dict per operation, in order.
+    """
+    writes = [op for op in operations if atomic and op.method.upper() != "GET"]
+    write_ids = {id(op) for op in writes}
+    singles = [op for op in operations if id(op) not in write_ids]
+
+    batch = _post_batch([writes] if writes else [], singles)
+    groups = batch.pop("groups")
+    if batch["status"] == "error":
+        return {**batch, "responses": []}
+
+    responses = [r for group in groups for r in group]
+    return _with_first_error({**batch, "responses": responses}, responses)
+
+def call_dataverse_changesets(changesets: list[list[BatchOperation]]) -> dict:
+    """
+    Sends several independent changesets in one `$batch` request: each changeset is
+    applied all-or-nothing, and a failing changeset does not roll back the others.
+
+    Returns:
+    - dict with status/status_code/error like `call_dataverse` (the first failure, if any),
+      plus "changesets": one list of `call_dataverse`-like dicts per changeset, in order
+      (a failed changeset only holds the failing operation). It is shorter than
+      `changesets` only if Dataverse stopped early: the missing tail was not attempted.
+    """
+    batch = _post_batch(changesets, [])
+    groups = batch.pop("groups")
+    if batch["status"] == "error":
+        return {**batch, "changesets": []}
+
+    responses = [r for group in groups for r in group]
+    return _with_first_error({**batch, "changesets": groups}, responses)
@@ -2,7 +2,7 @@ from __future__ import annotations
 import os
 from pathlib import Path
 from functools import lru_cache
-from dotenv import load_dotenv, dotenv_values
+from dotenv import dotenv_values
 
 from .runtime_paths import resolve_runtime_path
 
@@ -14,13 +14,19 @@ def _load_env() -> dict:
     for rel in CANDIDATES:
         p = resolve_runtime_path(rel)
         if p:
-            load_dotenv(p, override=False)
-            return {"path": p, "values": dotenv_values(p)}
+            # Parse once; same effect as load_dotenv(p, override=False) without a second read
+            values = dotenv_values(p)
+            for k, v in values.items():
+                if v is not None:
+                    os.environ.setdefault(k, v)
+            return {"path": p, "values": values}
     # If there is no .env, we return empty (system environment variables will be used)
     return {"path": None, "values": {}}
 
 def get_env_variable_value(key: str, default: str | None = None, *, required: bool = False) -> str | None:
-    """Gets a variable by reading .env (if it exists) and then os.environ."""
+    """Gets a variable from os.environ after loading .env into it (once per process, if it exists)."""
+    # Always loaded, even when `key` is already set: other modules read .env values straight
+    # from os.getenv (AUTHORITY, LOG_DIR, LOG_LEVEL); _load_env is cached, so this is cheap
     data = _load_env()
     val = os.getenv(key)
     if val is None:
@@ -0,0 +1,13 @@
+from __future__ import annotations
+from typing import Iterable, List
+
+def clean_guid(g: str) -> str:
+    """Remove braces and spaces from the GUID in case it comes with {}."""
+    # Fast path: already a bare 36-char GUID
+    if len(g) == 36 and g[0] != "{" and not g[0].isspace() and not g[-1].isspace():
+        return g
+    return g.strip().strip("{}")
+
+def clean_guids(guids: Iterable[str]) -> List[str]:
+    """`clean_guid` over a sequence of GUIDs."""
+    return [clean_guid(g) for g in guids]
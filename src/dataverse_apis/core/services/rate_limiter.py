@@ -0,0 +1,95 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Mapping
+
+# Dataverse service protection headers (remaining requests in the current window)
+BURST_REMAINING_HEADER = "x-ms-ratelimit-burst-remaining-xrm-requests"
+# Successful responses in a row after which a slowed-down rate climbs back by one request/sec
+RECOVERY_SUCCESSES = 20
+
+def _header_number(value: str | None) -> float | None:
+    """Numeric header value ("1,199.5" -> 1199.5; Dataverse may use thousands separators)."""
+    if value is None:
+        return None
+    try:
+        return float(value.replace(",", ""))
+    except ValueError:
+        return None  # e.g. an HTTP-date Retry-After: left to the session's own retry
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: up to `capacity` requests at once, refilled at
+    `refill_per_sec`. `acquire()` blocks until a token is available.
+
+    A 429 halves the rate (`slow_down`) and, with a Retry-After, pauses every caller for
+    that long; `record_success` then brings the rate back up to `refill_per_sec`, one
+    request/sec per RECOVERY_SUCCESSES successes (AIMD).
+    """
+
+    def __init__(self, capacity: float, refill_per_sec: float):
+        if capacity <= 0 or refill_per_sec <= 0:
+            raise ValueError("capacity and refill_per_sec must be > 0")
+        self.capacity = float(capacity)
+        self.rate = float(refill_per_sec)
+        self.max_rate = self.rate
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)  # outside the lock so other threads can refill/observe
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """
+        Adjust to what the server reports: never hold more tokens than the requests
+        left in Dataverse's burst window.
+        """
+        remaining_n = _header_number(headers.get(BURST_REMAINING_HEADER))
+        if remaining_n is None:
+            return
+        with self._lock:
+            self._tokens = min(self._tokens, remaining_n)
+
+    def slow_down(self, retry_after: str | None = None, factor: float = 0.5, min_rate: float = 1.0) -> None:
+        """
+        Throttled anyway (429): lower the refill rate (multiplicative decrease) and, given
+        the response's Retry-After (seconds), hold every caller until it has elapsed.
+        """
+        pause = _header_number(retry_after)
+        with self._lock:
+            self.rate = max(min_rate, self.rate * factor)
+            self._successes = 0
+            if pause and pause > 0:
+                now = time.monotonic()
+                # One request right when the pause is over, then the (lowered) rate: no burst
+                self._paused_until = max(self._paused_until, now + pause)
+                self._tokens = min(1.0, self.capacity)
+                self._last_refill = self._paused_until
+
+    def record_success(self) -> None:
+        """A request went through: after RECOVERY_SUCCESSES in a row, raise the rate by 1/sec."""
+        with self._lock:
+            if self.rate >= self.max_rate:
+                return
+            self._successes += 1
+            if self._successes >= RECOVERY_SUCCESSES:
+                self._successes = 0
+                self.rate = min(self.max_rate, self.rate + 1.0)
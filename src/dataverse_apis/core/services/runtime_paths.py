@@ -3,6 +3,10 @@ import sys, inspect
 from pathlib import Path
 from typing import Optional
 
+# This module's folder and its parents (fixed for the process: resolved once)
+_THIS_FILE = Path(__file__).resolve()
+_THIS_BASES = (_THIS_FILE.parent, *_THIS_FILE.parents)
+
 def resolve_runtime_path(rel_path: str | Path) -> Optional[str]:
     """Search for a relative resource (e.g., 'resources/entity_mapping.xlsx' or 'drivers/chromedriver.exe')
     in this order:
@@ -29,18 +33,18 @@ def resolve_runtime_path(rel_path: str | Path) -> Optional[str]:
     # 3) CWD
     candidates.append(Path.cwd() / rel_path)
 
-    # 4) Caller dir and its parents
+    # 4) Caller dir and its parents (only the caller's frame: inspect.stack() would
+    #    build every frame of the stack and read their source lines)
     try:
-        caller_file = Path(inspect.stack()[1].filename).resolve()
+        caller_frame = inspect.currentframe().f_back
+        caller_file = Path(caller_frame.f_code.co_filename).resolve()
         caller_bases = [caller_file.parent, *caller_file.parents]
         candidates.extend(base / rel_path for base in caller_bases)
     except Exception:
         pass
 
     # 5) This module dir and its parents
-    this_file = Path(__file__).resolve()
-    this_bases = [this_file.parent, *this_file.parents]
-    candidates.extend(base / rel_path for base in this_bases)
+    candidates.extend(base / rel_path for base in _THIS_BASES)
 
     # Return first existing
     for p in candidates:
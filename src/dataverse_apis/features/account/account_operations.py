@@ -1,15 +1,53 @@
 # dataverse_apis/features/account/account_operations.py
 from __future__ import annotations
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+from urllib.parse import quote
+
+import requests
+
 from src.dataverse_apis.features.dataverse_helper.dataverse_helper import validate_dataverse_error_message
-from src.dataverse_apis.core.services.dataverse_client import call_dataverse
-from src.dataverse_apis.features.timeline.note_operations import create_account_note, delete_note_by_id, find_last_deactivation_note_for_account
+from src.dataverse_apis.core.services.dataverse_client import (
+    call_dataverse,
+    call_dataverse_batch,
+    call_dataverse_changesets,
+    BatchOperation,
+)
+from src.dataverse_apis.core.services.guid_utils import clean_guid
+from src.dataverse_apis.features.timeline.note_operations import (
+    DEACTIVATION_SUBJECT,
+    build_account_note_payload,
+    create_account_note,
+    delete_note_by_id,
+    find_last_deactivation_note_for_account,
+)
+
+# statecode/statuscode pairs sent with PATCH /accounts(<id>)
+DEACTIVATE_PAYLOAD = {
+    "statecode": 1,  # Inactive
+    "statuscode": 2,  # Inactive
+}
+REACTIVATE_PAYLOAD = {
+    "statecode": 0,  # Active
+    "statuscode": 1,  # Active
+}
 
+# Timeline note body for deactivations (HTML, formatted once per note)
+_NOTE_TEMPLATE = "{reason_html}Action performed by: {performed_by}<br>"
 
-def _clean_guid(g: str) -> str:
-    """Remove braces and spaces from the GUID in case it comes with {}."""
-    return g.strip().strip("{}")
+# Accounts per $batch request in `deactivate_accounts_batch` (2 operations each;
+# Dataverse accepts up to 1000 operations per batch)
+BATCH_SIZE = 50
 
+# BUS IDs per query in `get_account_ids_by_bus_ids` (keeps the URL far from Dataverse's limit)
+LOOKUP_CHUNK_SIZE = 50
+
+def _build_note_body(reason: Optional[str], performed_by: Optional[str]) -> str:
+    # reason/performed_by may carry HTML on purpose (e.g. <strong>, <br>): inserted as-is
+    return _NOTE_TEMPLATE.format(
+        reason_html=f"{reason}<br>" if reason else "",
+        performed_by=performed_by or "unknown",
+    )
 
 def deactivate_account(account_id: str) -> dict:
     """
@@ -19,14 +57,18 @@ def deactivate_account(account_id: str) -> dict:
     - statuscode: 1 (Inactive)
     - statuscode: 2 (Inactive)
     """
-    endpoint = f"accounts({_clean_guid(account_id)})"
-    payload = {
-        "statecode": 1,  # Inactive
-        "statuscode": 2,  # Inactive
-    }
+    endpoint = f"accounts({clean_guid(account_id)})"
 
     # PATCH /accounts(<id>)
-    return call_dataverse(endpoint, method="PATCH", data=payload)
+    return call_dataverse(endpoint, method="PATCH", data=DEACTIVATE_PAYLOAD)
+
+def _batch_rejected(batch_resp: Dict[str, Any]) -> bool:
+    """True when $batch itself was refused (not one of its operations) -> use plain calls."""
+    return (
+        batch_resp.get("status_code") == 400
+        and not batch_resp.get("responses")
+        and not batch_resp.get("changesets")
+    )
 
 def deactivate_account_with_note(
     account_id: str,
@@ -35,6 +77,8 @@ def deactivate_account_with_note(
 ) -> Dict[str, Any]:
     """
     Deactivate an account and create a note on the timeline explaining what happened.
+
+    Both writes go in one $batch changeset (one round trip, all-or-nothing).
     """
     result: Dict[str, Any] = {
         "account_id": account_id,
@@ -45,58 +89,146 @@ def deactivate_account_with_note(
     }
 
     try:
-        # 1) Deactivate your Dataverse account
-        deactivate_resp = deactivate_account(account_id=account_id)
-        validate_dataverse_error_message(result, deactivate_resp, "deactivate_response")
-        
-        if deactivate_resp.get("status") == "error":
-            return result  # Early return on error
-        
+        # 1) Professional text formatting
+        # -------------------------------
+        note_body = _build_note_body(reason, performed_by)
+
+        # 2) Deactivate the account + create the note on its timeline
+        batch_resp = call_dataverse_batch([
+            BatchOperation("PATCH", f"accounts({clean_guid(account_id)})", DEACTIVATE_PAYLOAD),
+            BatchOperation("POST", "annotations", build_account_note_payload(
+                target_account_id=account_id,
+                subject=DEACTIVATION_SUBJECT,
+                body_text=note_body,
+            )),
+        ])
+        if _batch_rejected(batch_resp):
+            return _deactivate_account_with_note_sequential(result, account_id, note_body)
+
+        validate_dataverse_error_message(result, batch_resp, "batch_response")
+        responses = batch_resp.get("responses", [])
+        if batch_resp.get("status") == "error" or len(responses) != 2:
+            return result  # Early return on error (the changeset was rolled back)
+
+        deactivate_resp, note_resp = responses
         result["deactivated"] = True
         result["deactivate_response"] = deactivate_resp
-
-        # 2) Professional text formatting
-        # -------------------------------
-        reason_html = (
-            f"{reason}<br>" if reason else ""
-        )
-
-        note_body = (
-            f"{reason_html}"
-            f"Action performed by: {performed_by}<br>"
-        )
-
-        # 3) Create note on the account timeline
-        note_resp = create_account_note(
-            target_account_id=account_id,
-            subject="Account Deactivated",
-            body_text=note_body,
-        )
-        
-        validate_dataverse_error_message(result, deactivate_resp, "note_response")
-        
-        if note_resp.get("status") == "error":
-            return result  # Early return on error
-        
         result["note_created"] = True
         result["note_response"] = note_resp
 
-    except Exception as exc:  # pylint: disable=broad-except
+    except (requests.ConnectionError, requests.Timeout) as exc:
         result["error"] = str(exc)
 
     return result
 
+def _deactivate_account_with_note_sequential(
+    result: Dict[str, Any],
+    account_id: str,
+    note_body: str,
+) -> Dict[str, Any]:
+    """Fallback for `deactivate_account_with_note`: one call per write."""
+    # 1) Deactivate your Dataverse account
+    deactivate_resp = deactivate_account(account_id=account_id)
+    validate_dataverse_error_message(result, deactivate_resp, "deactivate_response")
+    
+    if deactivate_resp.get("status") == "error":
+        return result  # Early return on error
+    
+    result["deactivated"] = True
+    result["deactivate_response"] = deactivate_resp
+
+    # 2) Create note on the account timeline
+    note_resp = create_account_note(
+        target_account_id=account_id,
+        subject=DEACTIVATION_SUBJECT,
+        body_text=note_body,
+    )
+    
+    validate_dataverse_error_message(result, note_resp, "note_response")
+    
+    if note_resp.get("status") == "error":
+        return result  # Early return on error
+    
+    result["note_created"] = True
+    result["note_response"] = note_resp
+    return result
+
+def deactivate_accounts_batch(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Deactivate several accounts, each with its timeline note, in one $batch request.
+
+    - rows: [{"account_id": ..., "reason": ..., "performed_by": ...}] (reason/performed_by optional);
+      send at most BATCH_SIZE rows per call.
+    - Every account is its own changeset: a failure only rolls back that account.
+
+    Returns one result per row (same order), shaped like `deactivate_account_with_note`.
+    Rows Dataverse never got to (no response in the $batch) come back with
+    "not_attempted": True and no error: nothing was applied, they can be sent again.
+    """
+    results: List[Dict[str, Any]] = [
+        {
+            "account_id": row["account_id"],
+            "deactivated": False,
+            "note_created": False,
+            "status_code": None,
+            "error": None,
+        }
+        for row in rows
+    ]
+    if not rows:
+        return results
+
+    changesets = [
+        [
+            BatchOperation("PATCH", f"accounts({clean_guid(row['account_id'])})", DEACTIVATE_PAYLOAD),
+            BatchOperation("POST", "annotations", build_account_note_payload(
+                target_account_id=row["account_id"],
+                subject=DEACTIVATION_SUBJECT,
+                body_text=_build_note_body(row.get("reason"), row.get("performed_by")),
+            )),
+        ]
+        for row in rows
+    ]
+    batch_resp = call_dataverse_changesets(changesets)
+
+    if _batch_rejected(batch_resp):
+        # $batch refused as a whole -> one account at a time
+        return [
+            deactivate_account_with_note(row["account_id"], row.get("reason"), row.get("performed_by"))
+            for row in rows
+        ]
+
+    groups = batch_resp.get("changesets", [])
+    if not groups:
+        # The whole request failed (network, auth, ...): same error for every account
+        for result in results:
+            validate_dataverse_error_message(result, batch_resp, "batch_response")
+        return results
+
+    # Changeset n answers row n (responses come back in request order)
+    for result in results[len(groups):]:
+        result["not_attempted"] = True
+    for result, responses in zip(results, groups):
+        if len(responses) != 2 or any(r.get("status") == "error" for r in responses):
+            # Changeset rolled back: only the failing operation comes back
+            validate_dataverse_error_message(result, responses[0] if responses else batch_resp, "batch_response")
+            continue
+        deactivate_resp, note_resp = responses
+        result["status_code"] = note_resp.get("status_code")
+        result["deactivated"] = True
+        result["deactivate_response"] = deactivate_resp
+        result["note_created"] = True
+        result["note_response"] = note_resp
+
+    return results
+
 def reactivate_account(account_id: str) -> dict:
     """
     Reactivate an Account (active statecode/statuscode).
     """
-    endpoint = f"accounts({_clean_guid(account_id)})"
-    payload = {
-        "statecode": 0,  # Active
-        "statuscode": 1,  # Active
-    }
+    endpoint = f"accounts({clean_guid(account_id)})"
 
-    return call_dataverse(endpoint, method="PATCH", data=payload)
+    return call_dataverse(endpoint, method="PATCH", data=REACTIVATE_PAYLOAD)
 
 
 def reactivate_account_and_delete_note(
@@ -106,8 +238,9 @@ def reactivate_account_and_delete_note(
     """
     Reactivate an account and optionally delete the deactivation note.
 
-    - If note_id is None, only reactivate the account.
-    - If it has a value, try deleting that annotation.
+    - If note_id is None, search for the last deactivation note.
+    - If a note is known, the PATCH and the DELETE go in one $batch changeset;
+      otherwise only the account is reactivated.
     """
     result: Dict[str, Any] = {
         "account_id": account_id,
@@ -117,41 +250,151 @@ def reactivate_account_and_delete_note(
     }
 
     try:
-        # 1) Reactivate account
-        reactivate_resp = reactivate_account(account_id)
-        validate_dataverse_error_message(result, reactivate_resp, "reactive_response")
-        
-        if reactivate_resp.get("status") == "error":
-            return result  # Early return on error
-        
-        result["reactivated"] = True
-        result["reactivate_response"] = reactivate_resp
-
-        # 2) Delete note (if we have an ID)
+        # 1) Note to delete (if we have an ID)
         target_note_id = note_id
         if not target_note_id:
             # Automatically search for the deactivation note
             target_note_id = find_last_deactivation_note_for_account(
-                _clean_guid(account_id)
+                clean_guid(account_id)
             )
 
-        if target_note_id:
-            delete_resp = delete_note_by_id(target_note_id)
-            validate_dataverse_error_message(result, delete_resp, "delete_note_response")
-            
-            if delete_resp.get("status") == "error":
+        if not target_note_id:
+            # Not found, it's not a fatal error -> just reactivate
+            reactivate_resp = reactivate_account(account_id)
+            validate_dataverse_error_message(result, reactivate_resp, "reactive_response")
+            if reactivate_resp.get("status") == "error":
                 return result  # Early return on error
-            
-            result["note_deleted"] = True
-            result["note_delete_response"] = delete_resp
-        else:
-            result["note_deleted"] = False  # Not found, it's not a fatal error
+            result["reactivated"] = True
+            result["reactivate_response"] = reactivate_resp
+            return result
 
-    except Exception as exc:
+        # 2) Reactivate account + delete note
+        batch_resp = call_dataverse_batch([
+            BatchOperation("PATCH", f"accounts({clean_guid(account_id)})", REACTIVATE_PAYLOAD),
+            BatchOperation("DELETE", f"annotations({clean_guid(target_note_id)})"),
+        ])
+        if _batch_rejected(batch_resp):
+            return _reactivate_account_and_delete_note_sequential(result, account_id, target_note_id)
+
+        validate_dataverse_error_message(result, batch_resp, "batch_response")
+        responses = batch_resp.get("responses", [])
+        if batch_resp.get("status") == "error" or len(responses) != 2:
+            return result  # Early return on error (the changeset was rolled back)
+
+        reactivate_resp, delete_resp = responses
+        result["reactivated"] = True
+        result["reactivate_response"] = reactivate_resp
+        result["note_deleted"] = True
+        result["note_delete_response"] = delete_resp
+
+    except (requests.ConnectionError, requests.Timeout) as exc:
         result["error"] = str(exc)
 
     return result
 
+def reactivate_accounts_batch(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Reactivate several accounts, each with its deactivation note deleted, in one $batch request.
+
+    - rows: [{"account_id": ..., "note_id": ...}] (note_id optional: when missing, the last
+      deactivation note is searched first, as in `reactivate_account_and_delete_note`);
+      send at most BATCH_SIZE rows per call.
+    - Every account is its own changeset (PATCH, plus DELETE when a note is known).
+
+    Returns one result per row (same order), shaped like `reactivate_account_and_delete_note`.
+    Rows Dataverse never got to come back with "not_attempted": True and no error.
+    """
+    results: List[Dict[str, Any]] = [
+        {
+            "account_id": row["account_id"],
+            "reactivated": False,
+            "note_deleted": False,
+            "status_code": None,
+            "error": None,
+        }
+        for row in rows
+    ]
+    if not rows:
+        return results
+
+    # 1) Notes to delete: the GETs for the missing ones overlap on the pooled session
+    missing = [i for i, row in enumerate(rows) if not row.get("note_id")]
+    note_ids = [row.get("note_id") for row in rows]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(8, len(missing))) as executor:
+            found = executor.map(
+                lambda i: find_last_deactivation_note_for_account(clean_guid(rows[i]["account_id"])),
+                missing,
+            )
+            for i, note_id in zip(missing, found):
+                note_ids[i] = note_id
+
+    # 2) Reactivate + delete, one changeset per account
+    changesets = [
+        [BatchOperation("PATCH", f"accounts({clean_guid(row['account_id'])})", REACTIVATE_PAYLOAD)]
+        + ([BatchOperation("DELETE", f"annotations({clean_guid(note_id)})")] if note_id else [])
+        for row, note_id in zip(rows, note_ids)
+    ]
+    batch_resp = call_dataverse_changesets(changesets)
+
+    if _batch_rejected(batch_resp):
+        # $batch refused as a whole -> one account at a time
+        return [
+            reactivate_account_and_delete_note(row["account_id"], note_id)
+            for row, note_id in zip(rows, note_ids)
+        ]
+
+    groups = batch_resp.get("changesets", [])
+    if not groups:
+        # The whole request failed (network, auth, ...): same error for every account
+        for result in results:
+            validate_dataverse_error_message(result, batch_resp, "batch_response")
+        return results
+
+    # Changeset n answers row n (responses come back in request order)
+    for result in results[len(groups):]:
+        result["not_attempted"] = True
+    for result, ops, responses in zip(results, changesets, groups):
+        if len(responses) != len(ops) or any(r.get("status") == "error" for r in responses):
+            # Changeset rolled back: only the failing operation comes back
+            validate_dataverse_error_message(result, responses[0] if responses else batch_resp, "batch_response")
+            continue
+        result["status_code"] = responses[0].get("status_code")
+        result["reactivated"] = True
+        result["reactivate_response"] = responses[0]
+        if len(responses) == 2:
+            result["note_deleted"] = True
+            result["note_delete_response"] = responses[1]
+
+    return results
+
+def _reactivate_account_and_delete_note_sequential(
+    result: Dict[str, Any],
+    account_id: str,
+    note_id: str,
+) -> Dict[str, Any]:
+    """Fallback for `reactivate_account_and_delete_note`: one call per write."""
+    # 1) Reactivate account
+    reactivate_resp = reactivate_account(account_id)
+    validate_dataverse_error_message(result, reactivate_resp, "reactive_response")
+    
+    if reactivate_resp.get("status") == "error":
+        return result  # Early return on error
+    
+    result["reactivated"] = True
+    result["reactivate_response"] = reactivate_resp
+
+    # 2) Delete note
+    delete_resp = delete_note_by_id(note_id)
+    validate_dataverse_error_message(result, delete_resp, "delete_note_response")
+    
+    if delete_resp.get("status") == "error":
+        return result  # Early return on error
+    
+    result["note_deleted"] = True
+    result["note_delete_response"] = delete_resp
+    return result
+
 def get_account_id_by_bus_id(bus_id: str) -> Dict[str, Any]:
     """
     Searches for an account by BUS ID (account number) and returns a dictionary consistent with the other account operations.
@@ -180,7 +423,50 @@ def get_account_id_by_bus_id(bus_id: str) -> Dict[str, Any]:
             result["account_id"] = account_id
             result["found"] = True
 
-    except Exception as exc:
+    except (requests.ConnectionError, requests.Timeout) as exc:
         result["error"] = str(exc)
 
-    return result
\ No newline at end of file
+    return result
+
+def _odata_string(value: str) -> str:
+    """OData string literal: quoted, with single quotes doubled."""
+    return "'" + value.replace("'", "''") + "'"
+
+def get_account_ids_by_bus_ids(bus_ids: List[str]) -> Dict[str, Any]:
+    """
+    Searches for several accounts by BUS ID with a single query (meant for up to
+    LOOKUP_CHUNK_SIZE BUS IDs). Matching ignores case, like the `eq` filter does.
+
+    Returns {"account_ids": {bus_id: account_id or None}, "status_code", "error"}.
+    """
+    result: Dict[str, Any] = {
+        "account_ids": dict.fromkeys(bus_ids),
+        "status_code": None,
+        "error": None,
+    }
+    if not bus_ids:
+        return result
+
+    filter_expr = " or ".join(f"accountnumber eq {_odata_string(bus_id)}" for bus_id in bus_ids)
+    endpoint = (
+        "accounts?"
+        f"$select=accountid,accountnumber"
+        f"&$filter={quote(filter_expr)}"
+    )
+
+    try:
+        resp = call_dataverse(endpoint, method="GET")
+        validate_dataverse_error_message(result, resp, "account_ids_response")
+
+        # First match per account number wins (as in get_account_id_by_bus_id)
+        by_number: Dict[str, Optional[str]] = {}
+        for record in resp.get("value", []):
+            number = record.get("accountnumber")
+            if number:
+                by_number.setdefault(number.casefold(), record.get("accountid"))
+        result["account_ids"] = {bus_id: by_number.get(bus_id.casefold()) for bus_id in bus_ids}
+
+    except (requests.ConnectionError, requests.Timeout) as exc:
+        result["error"] = str(exc)
+
+    return result
@@ -1,61 +1,76 @@
 from src.dataverse_apis.core.services.dataverse_client import call_dataverse
+from src.dataverse_apis.core.services.guid_utils import clean_guid
 from typing import Optional
 
+# Optional: faster JSON encoding for note bodies
+try:
+    import orjson
+    _HAS_ORJSON = True
+except Exception:
+    orjson = None
+    _HAS_ORJSON = False
+
 DEACTIVATION_SIGNATURE = "This account was deactivated on "
+DEACTIVATION_SUBJECT = "Account Deactivated"
+_ACCOUNT_BIND_KEY = "objectid_account@odata.bind"
+
+def build_account_note_payload(target_account_id: str, subject: str, body_text: str) -> dict:
+    """
+    Body for POST /annotations bound to an Account (shared by direct and $batch calls).
+    """
+    return {
+        "subject": subject,
+        "notetext": body_text,
+        # Bind to the account target
+        _ACCOUNT_BIND_KEY: f"/accounts({clean_guid(target_account_id)})"
+    }
 
 def create_account_note(target_account_id: str, subject: str, body_text: str) -> dict:
     """
     Create an annotation linked to an Account to appear on the Timeline.
     """
-    try:
-        endpoint = "annotations"  # Web API: POST /api/data/v9.2/annotations
-        payload = {
-            "subject": subject,
-            "notetext": body_text,
-            # Bind to the account target
-            "objectid_account@odata.bind": f"/accounts({_clean_guid(target_account_id)})"
-        }
-        return call_dataverse(endpoint, method="POST", data=payload)
-    except Exception as e:
-        return {"status": f"error: {str(e)}", "code": 500}
+    endpoint = "annotations"  # Web API: POST /api/data/v9.2/annotations
+    payload = build_account_note_payload(target_account_id, subject, body_text)
+    # call_dataverse never raises: errors come back as {"status": "error", ...}
+    if _HAS_ORJSON:
+        return call_dataverse(endpoint, method="POST", data_bytes=orjson.dumps(payload))
+    return call_dataverse(endpoint, method="POST", data=payload)
     
 def delete_note_by_id(note_id: str) -> dict:
     """
     Remove a specific annotation by its GUID.
     """
-    try:
-        endpoint = f"annotations({_clean_guid(note_id)})"
-        return call_dataverse(endpoint, method="DELETE")
-    except Exception as e:
-        return {"status": f"error: {str(e)}", "code": 500}
+    endpoint = f"annotations({clean_guid(note_id)})"
+    return call_dataverse(endpoint, method="DELETE")
     
 def find_last_deactivation_note_for_account(account_id: str) -> Optional[str]:
     """
     Returns the annotationid of the last deactivation note created by our script.
-    Uses a secure contains element based on a unique text signature.
+    Matches the exact note subject first (index-friendly); the `contains(notetext, ...)`
+    signature search is only used as a fallback for older notes.
     """
-
-    endpoint = (
-        "annotations?"
-        "$select=annotationid,createdon,notetext&"
-        "$orderby=createdon desc&"
-        "$top=1&"
-        "$filter="
+    by_subject = (
+        f"objectid_account/accountid eq {account_id} "
+        f"and subject eq '{DEACTIVATION_SUBJECT}'"
+    )
+    by_signature = (
         f"objectid_account/accountid eq {account_id} "
         f"and contains(notetext,'{DEACTIVATION_SIGNATURE}')"
     )
 
-    try:
+    for note_filter in (by_subject, by_signature):
+        endpoint = (
+            "annotations?"
+            "$select=annotationid,createdon&"
+            "$orderby=createdon desc&"
+            "$top=1&"
+            f"$filter={note_filter}"
+        )
         resp = call_dataverse(endpoint, method="GET")
-        value = resp.get("value", [])
-        if not value:
+        if resp.get("status") == "error":
             return None
+        value = resp.get("value", [])
+        if value:
+            return value[0].get("annotationid")
 
-        return value[0].get("annotationid")
-
-    except Exception as e:
-        return None
-    
-def _clean_guid(g: str) -> str:
-    """Remove braces and spaces from the GUID in case it comes with {}."""
-    return g.strip().strip("{}")
\ No newline at end of file
+    return None
@@ -1,84 +1,140 @@
+from functools import lru_cache
+from itertools import islice
 import pandas as pd
-from ..core.services.dataverse_client import call_dataverse
+from ..core.services.dataverse_client import call_dataverse, call_dataverse_paged
+from ..features.account.account_operations import LOOKUP_CHUNK_SIZE, get_account_ids_by_bus_ids
+
+# Optional: Rust reader for .xlsx/.xls input (pd.read_excel(engine="calamine"))
+try:
+    import python_calamine  # noqa: F401
+    _HAS_CALAMINE = True
+except Exception:
+    _HAS_CALAMINE = False
+
+# Optional: Arrow strings for the BUS ID column
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
 
 INPUT_FILE = "data/Merge_Accounts_ICPS - format.xlsx"
 COLUMN_NAME = "BUS ID"
+ICPS_ACCOUNTS_FILE = "ICPS_Accounts.csv"
+# Records per page (Dataverse's maximum); also the number of rows held in memory at once
+ICPS_PAGE_SIZE = 5000
 
 def get_column_name():
     return COLUMN_NAME
 
-def get_account_id_by_bus_id(bus_id: str) -> str | None:
+def _read_input_file() -> pd.DataFrame:
+    """
+    Reads INPUT_FILE, with calamine when it is installed (pandas' openpyxl reader otherwise).
+    BUS IDs are identifiers: read as text, never as numbers (Arrow strings with pyarrow).
+    """
+    dtype = {COLUMN_NAME: "string[pyarrow]" if _HAS_PYARROW else "string"}
+    if _HAS_CALAMINE:
+        return pd.read_excel(INPUT_FILE, engine="calamine", dtype=dtype)
+    return pd.read_excel(INPUT_FILE, dtype=dtype)
+
+@lru_cache(maxsize=100_000)
+def _lookup_account_id(bus_id: str) -> str | None:
     endpoint = f"accounts?$filter=accountnumber eq '{bus_id}'&$select=accountid"
     result = call_dataverse(endpoint)
-    
+    if result.get("status") == "error":
+        # Raising keeps the failure out of the cache (lru_cache only stores returned values)
+        raise RuntimeError(result.get("error"))
+
     records = result.get("value", [])
     if records:
         return records[0].get("accountid")
     return None
 
-def fetch_accounts_from_ICPS() -> pd.DataFrame:
-    endpoint = "accounts"
-    records = []
-
-    while endpoint:
-        result = call_dataverse(endpoint)
-        batch = result.get("value", [])
-        records.extend(batch)
-        endpoint = result.get("@odata.nextLink")
-        
-        # Remove the full URL if `call_dataverse()` only accepts the relative path
-        if endpoint and endpoint.startswith("https://"):
-            endpoint = endpoint.split("/api/data/v9.2/")[-1]
-            
-    df = pd.DataFrame(records)
-    df.to_excel("ICPS_Accounts.xlsx", index=False)
-
-    return records
+def get_account_id_by_bus_id(bus_id: str) -> str | None:
+    """
+    Account ID for `bus_id` (None if not found or on error). Answers are memoized for the
+    session, so repeated BUS IDs cost one request; failed lookups are retried next time.
+    """
+    try:
+        return _lookup_account_id(bus_id)
+    except RuntimeError:
+        return None
+
+def clear_account_id_cache() -> None:
+    """Forget the memoized lookups (e.g. after signing in as another user)."""
+    _lookup_account_id.cache_clear()
+
+def fetch_accounts_from_ICPS(output_file: str = ICPS_ACCOUNTS_FILE) -> int:
+    """
+    Exports every account to `output_file` (CSV), one page at a time: each page is
+    appended as it arrives, so memory stays bounded by ICPS_PAGE_SIZE records.
+    Returns the number of accounts written.
+    """
+    pages = call_dataverse_paged("accounts", page_size=ICPS_PAGE_SIZE)
+    total = 0
+    columns = None
+
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        while batch := list(islice(pages, ICPS_PAGE_SIZE)):
+            # Same columns (and order) for every page: taken from the first one
+            page_df = pd.DataFrame(batch, columns=columns)
+            page_df.to_csv(f, header=columns is None, index=False)
+            columns = page_df.columns
+            total += len(batch)
+
+    return total
 
 def fetch_accounts() -> pd.DataFrame:
-    df = pd.read_excel(INPUT_FILE)
+    df = _read_input_file()
 
     if COLUMN_NAME not in df.columns:
         raise Exception(f"❌ The column '{COLUMN_NAME}' doesn't exist in the Excel file.")
 
-    df["accountid"] = df[COLUMN_NAME].apply(lambda bus_id: get_account_id_by_bus_id(bus_id))
+    # One query per LOOKUP_CHUNK_SIZE distinct BUS IDs, then a dict map back to every row
+    bus_ids = df[COLUMN_NAME].str.strip()
+    uniques = bus_ids.dropna().unique().tolist()
+    id_map = {}
+    for i in range(0, len(uniques), LOOKUP_CHUNK_SIZE):
+        id_map.update(get_account_ids_by_bus_ids(uniques[i:i + LOOKUP_CHUNK_SIZE])["account_ids"])
+
+    df["accountid"] = bus_ids.map(id_map).astype(object).where(bus_ids.notna(), None)
     return df
 
 def main():
     
     """
     Main function to read an Excel file, fetch account IDs for each Business ID,
-    and output the results to a new Excel file.
+    and output the results to a new CSV file.
 
     The function performs the following steps:
     1. Reads the input Excel file specified by INPUT_FILE.
     2. Checks if the specified column, COLUMN_NAME, exists in the DataFrame.
        Raises an exception if the column is not found.
-    3. Initializes a new column, 'accountid', in the DataFrame to store results.
-    4. Iterates over each row in the DataFrame, retrieves the Business ID, and
-       fetches the corresponding account ID using the get_account_id_by_bus_id function.
-    5. Stores the fetched account ID in the 'accountid' column, and prints the progress.
-    6. Exports the DataFrame with the results to an Excel file.
+    3. Iterates over the Business ID column and fetches the corresponding account ID
+       using the get_account_id_by_bus_id function, printing the progress.
+    4. Stores the fetched account IDs in a new 'accountid' column.
+    5. Exports the DataFrame with the results to a CSV file.
     """
 
-    df = pd.read_excel(INPUT_FILE)
+    df = _read_input_file()
 
     if COLUMN_NAME not in df.columns:
         raise Exception(f"❌ The column '{COLUMN_NAME}' doesn't exist in the Excel file. Make sure the column existe in the file..")
 
-    # New column to store results
-    df["accountid"] = None
+    # Results collected in a list and stored as a new column in one assignment
+    account_ids = []
 
-    for index, row in df.iterrows():
-        bus_id = row[COLUMN_NAME]
+    for bus_id in df[COLUMN_NAME].to_numpy():
         print(f"🔍 Searching accountid for BUS ID: {bus_id}...")
         account_id = get_account_id_by_bus_id(bus_id)
-        df.at[index, "accountid"] = account_id
+        account_ids.append(account_id)
         print(f"✅ Result: {account_id or 'Not found'}")
 
+    df["accountid"] = account_ids
+
     # Export results
-    output_file = "data/accounts_with_ids.xlsx"
-    df.to_excel(output_file, index=False)
+    output_file = "data/accounts_with_ids.csv"
+    df.to_csv(output_file, index=False)
     print(f"\n📁 File generated with results: {output_file}")
 
 if __name__ == "__main__":
@@ -2,11 +2,21 @@ import pandas as pd
 import base64
 import mimetypes
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 from .fetch_accounts import get_column_name
 from ..core.services.dataverse_client import call_dataverse
+from ..core.services.guid_utils import clean_guid
+from ..core.logging.logging_conf import get_logger
 
-OUTPUT_FILE = "data/merged_output_results.xlsx"
+log = get_logger(__name__)
+
+OUTPUT_FILE = "data/merged_output_results.csv"
+# Merge groups processed at once, and Merge requests in flight per group. Every merge of a
+# group updates the same target record, so concurrent ones contend for its lock: they run
+# one at a time by default and the concurrency comes from the groups
+MERGE_WORKERS = 4
+SUBORDINATE_WORKERS = 1
 
 def call_merge_endpoint(target_account_id: str, subordinate_account_id: str) -> dict:
     try:
@@ -36,7 +46,7 @@ def call_create_account_note(target_account_id: str, subject: str, body_text: st
             "subject": subject,
             "notetext": body_text,
             # Bind to the account target
-            "objectid_account@odata.bind": f"/accounts({_clean_guid(target_account_id)})"
+            "objectid_account@odata.bind": f"/accounts({clean_guid(target_account_id)})"
         }
         return call_dataverse(endpoint, method="POST", data=payload)
     except Exception as e:
@@ -62,7 +72,7 @@ def call_create_account_note_with_file(target_account_id: str, subject: str, bod
             "documentbody": b64,
             "filename": os.path.basename(file_path),
             "mimetype": mimetype,
-            "objectid_account@odata.bind": f"/accounts({ _clean_guid(target_account_id) })"
+            "objectid_account@odata.bind": f"/accounts({clean_guid(target_account_id)})"
         }
         return call_dataverse(endpoint, method="POST", data=payload)
     except Exception as e:
@@ -106,13 +116,13 @@ def call_create_account(
 
     # Lookups
     if parent_account_id:
-        payload["parentaccountid@odata.bind"] = f"/accounts({_clean_guid(parent_account_id)})"
+        payload["parentaccountid@odata.bind"] = f"/accounts({clean_guid(parent_account_id)})"
     if owner_user_id:
-        payload["ownerid@odata.bind"] = f"/systemusers({_clean_guid(owner_user_id)})"
+        payload["ownerid@odata.bind"] = f"/systemusers({clean_guid(owner_user_id)})"
     if primary_contact_id:
-        payload["primarycontactid@odata.bind"] = f"/contacts({_clean_guid(primary_contact_id)})"
+        payload["primarycontactid@odata.bind"] = f"/contacts({clean_guid(primary_contact_id)})"
     if currency_id:
-        payload["transactioncurrencyid@odata.bind"] = f"/transactioncurrencies({_clean_guid(currency_id)})"
+        payload["transactioncurrencyid@odata.bind"] = f"/transactioncurrencies({clean_guid(currency_id)})"
 
     # Campos extra (optionsets, custom columns, etc.)
     if extra:
@@ -127,46 +137,59 @@ def upsert_account_by_id(account_id: str, data: dict, create_if_missing: bool =
     headers = {}
     if create_if_missing:
         headers["If-None-Match"] = "*"
-    return call_dataverse(f"accounts({_clean_guid(account_id)})", method="PATCH", data=data, headers=headers)
-
-def _clean_guid(g: str) -> str:
-    """Remove braces and spaces from the GUID in case it comes with {}."""
-    return g.strip().strip("{}")
+    return call_dataverse(f"accounts({clean_guid(account_id)})", method="PATCH", data=data, headers=headers)
 
-def merge_accounts(target_account: dict, subordinate_accounts: list[dict]) -> dict:
+def merge_accounts(
+    target_account: dict,
+    subordinate_accounts: list[dict],
+    progress: bool = True,
+    max_workers: int = SUBORDINATE_WORKERS,
+) -> dict:
     errors = []
     details = {}
 
-    for subordinate in tqdm(
-        subordinate_accounts,
-        desc=f"🔃 Merging Group {target_account['Merge_Group_ID']}",
-        unit="sub",
-        leave=False,
-        ncols=60
-    ):
+    subordinate_ids = []
+    for subordinate in subordinate_accounts:
         subordinate_id = subordinate.get("accountid")
         if not subordinate_id:
             details["UNKNOWN"] = "❌ Subordinate without accountid"
             errors.append("Subordinate without accountid")
-            continue
-
-        try:
-            result = call_merge_endpoint(target_account["accountid"], subordinate_id)
-            code = result.get("code", None)
-            status = result.get("status", "unknown")
-
-            if code == 204:
-                details[subordinate_id] = f"✅ Merge successful (code: {code})"
-            else:
-                msg = f"❌ Merge failed (code: {code}, status: {status})"
+        else:
+            subordinate_ids.append(subordinate_id)
+
+    # One request per subordinate (max_workers > 1 overlaps them on the same target)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(call_merge_endpoint, target_account["accountid"], subordinate_id): subordinate_id
+            for subordinate_id in subordinate_ids
+        }
+        for future in tqdm(
+            as_completed(futures),
+            total=len(futures),
+            desc=f"🔃 Merging Group {target_account['Merge_Group_ID']}",
+            unit="sub",
+            leave=False,
+            ncols=60,
+            disable=None if progress else True,  # None: off when not on a terminal
+        ):
+            subordinate_id = futures[future]
+            try:
+                result = future.result()
+                code = result.get("code", None)
+                status = result.get("status", "unknown")
+
+                if code == 204:
+                    details[subordinate_id] = f"✅ Merge successful (code: {code})"
+                else:
+                    msg = f"❌ Merge failed (code: {code}, status: {status})"
+                    details[subordinate_id] = msg
+                    errors.append(msg)
+
+            except Exception as e:
+                msg = f"❌ Exception: {str(e)}"
                 details[subordinate_id] = msg
                 errors.append(msg)
 
-        except Exception as e:
-            msg = f"❌ Exception: {str(e)}"
-            details[subordinate_id] = msg
-            errors.append(msg)
-
     summary = "✅ All merges successful" if not errors else "❌ Merge completed with errors"
 
     return {
@@ -174,83 +197,108 @@ def merge_accounts(target_account: dict, subordinate_accounts: list[dict]) -> di
         "details": details
     }
 
+def _merge_group(group_id, target_account: dict, subordinate_accounts: list[dict]) -> dict:
+    """Merge one group and add the summary note to the target's Timeline (runs on a worker thread)."""
+    merge_output = merge_accounts(target_account, subordinate_accounts, progress=False)
+
+    # Construir el texto de la nota con el resumen y los detalles por account
+    target_id = target_account["accountid"]
+    subject = f"Merge de Accounts - Group {group_id}"
+
+    detail_lines = [
+        f"Merge Account executed",
+        f"• Target: {target_account['BUS ID']}",
+        "• Subordinates: " + ", ".join([s["BUS ID"] for s in subordinate_accounts]),
+        f"• Result: {merge_output['summary']}",
+        "",
+        "Details by Account:"
+    ]
+    # for acc_id, det in merge_output["details"].items():
+    #     detail_lines.append(f"  - {acc_id}: {det}")
+
+    for s in subordinate_accounts:
+        acc_id = s["accountid"]
+        bus_id = s.get("BUS ID") or acc_id
+        det = merge_output["details"].get(acc_id, "Without detail")
+        detail_lines.append(f"  - {bus_id}: {det}")
+
+    note_text = "\n".join(detail_lines)
+
+    # Crear la nota en el Timeline del Account padre
+    call_create_account_note(
+        target_account_id=target_id,
+        subject=subject,
+        body_text=note_text
+    )
+
+    return merge_output
+
 def process_merge_for_all_groups(df: pd.DataFrame) -> pd.DataFrame:
-    df["merge_result"] = None
-    df["merge_detail"] = None
     column_name = get_column_name()
 
     duplicates = df[df.duplicated(column_name, keep=False)]
     if not duplicates.empty:
         raise Exception(f"❌ Error: Duplicates found in '{column_name}' column:\n{duplicates[[column_name, 'Merge_Group_ID']]}")
 
-    for group_id, group in tqdm(df.groupby("Merge_Group_ID"), desc="🔄 Processing Merge Groups", unit="group"):
-        target_row = group[group["Merge_Role"] == 1]
-        subordinates = group[group["Merge_Role"] == 0]
-
-        if len(target_row) == 0:
-            df.loc[group.index, "merge_result"] = "❌ Error: No Target account in group"
-            df.loc[group.index, "merge_detail"] = "No Target account present"
+    # Rows materialized once for the whole frame; groups are handled by row position
+    records = df.to_dict(orient="records")
+    roles = df["Merge_Role"].to_numpy()
+    # Result/detail per row position, written to the DataFrame in one assignment at the end
+    merge_results = [None] * len(df)
+    merge_details = [None] * len(df)
+
+    def set_group(positions, result, detail):
+        for pos in positions:
+            merge_results[pos] = result
+            merge_details[pos] = detail
+
+    # Validate the groups first; only the valid ones are sent to Dataverse
+    valid_groups = {}
+    for group_id, positions in df.groupby("Merge_Group_ID").indices.items():
+        positions = positions.tolist()
+        target_pos = [pos for pos in positions if roles[pos] == 1]
+        subordinate_pos = [pos for pos in positions if roles[pos] == 0]
+
+        if len(target_pos) == 0:
+            set_group(positions, "❌ Error: No Target account in group", "No Target account present")
             continue
-        elif len(target_row) > 1:
-            df.loc[group.index, "merge_result"] = f"❌ Error: Multiple Target accounts in group ({len(target_row)})"
-            df.loc[group.index, "merge_detail"] = "Multiple Target accounts detected"
+        elif len(target_pos) > 1:
+            set_group(positions, f"❌ Error: Multiple Target accounts in group ({len(target_pos)})", "Multiple Target accounts detected")
             continue
-        elif len(subordinates) == 0:
-            df.loc[group.index, "merge_result"] = "❌ Error: No Subordinate in group"
-            df.loc[group.index, "merge_detail"] = "No Subordinate present"
+        elif len(subordinate_pos) == 0:
+            set_group(positions, "❌ Error: No Subordinate in group", "No Subordinate present")
             continue
 
-        target_account = target_row.iloc[0].to_dict()
-        subordinate_accounts = subordinates.to_dict(orient="records")
-
-        print("\n" + "-"*60)
-        print(f"🔧 Merge Group: {group_id}")
-        print(f"📌 Target Account ID: {target_account['accountid']}")
-        print(f"   ↳ Subordinate(s): {[s['accountid'] for s in subordinate_accounts]}")
-
-        merge_output = merge_accounts(target_account, subordinate_accounts)
-        
-        # Construir el texto de la nota con el resumen y los detalles por account
-        target_id = target_account["accountid"]
-        subject = f"Merge de Accounts - Group {group_id}"
-
-        detail_lines = [
-            f"Merge Account executed",
-            f"• Target: {target_account['BUS ID']}",
-            "• Subordinates: " + ", ".join([s["BUS ID"] for s in subordinate_accounts]),
-            f"• Result: {merge_output['summary']}",
-            "",
-            "Details by Account:"
-        ]
-        # for acc_id, det in merge_output["details"].items():
-        #     detail_lines.append(f"  - {acc_id}: {det}")
-        
-        for s in subordinate_accounts:
-            acc_id = s["accountid"]
-            bus_id = s.get("BUS ID") or acc_id
-            det = merge_output["details"].get(acc_id, "Without detail")
-            detail_lines.append(f"  - {bus_id}: {det}")
-
-        note_text = "\n".join(detail_lines)
-
-        # Crear la nota en el Timeline del Account padre
-        note_resp = call_create_account_note(
-            target_account_id=target_id,
-            subject=subject,
-            body_text=note_text
-        )
-
-        df.loc[group.index, "merge_result"] = merge_output["summary"]
-
-        for idx, row in group.iterrows():
-            account_id = row.get("accountid")
-            detail = merge_output["details"].get(
-                account_id,
-                "✅ Main account (no action)" if row["Merge_Role"] == 1 else "⚠️ No detail"
+        valid_groups[group_id] = (positions, records[target_pos[0]], [records[pos] for pos in subordinate_pos])
+
+    # Groups are independent (different targets): merge several at once
+    with ThreadPoolExecutor(max_workers=MERGE_WORKERS) as executor:
+        futures = {
+            executor.submit(_merge_group, group_id, target_account, subordinate_accounts): group_id
+            for group_id, (_positions, target_account, subordinate_accounts) in valid_groups.items()
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="🔄 Processing Merge Groups", unit="group", disable=None):
+            group_id = futures[future]
+            positions, target_account, subordinate_accounts = valid_groups[group_id]
+            merge_output = future.result()
+
+            log.info(
+                "Merge Group %s | Target %s | %d subordinate(s): %s",
+                group_id, target_account["accountid"], len(subordinate_accounts), merge_output["summary"],
             )
-            df.at[idx, "merge_detail"] = detail
+            log.debug("Merge Group %s subordinates: %s", group_id, [s["accountid"] for s in subordinate_accounts])
+
+            for pos in positions:
+                merge_results[pos] = merge_output["summary"]
+                merge_details[pos] = merge_output["details"].get(
+                    records[pos]["accountid"],
+                    "✅ Main account (no action)" if roles[pos] == 1 else "⚠️ No detail"
+                )
+
+    df["merge_result"] = merge_results
+    df["merge_detail"] = merge_details
 
-    df.to_excel(OUTPUT_FILE, index=False)
+    df.to_csv(OUTPUT_FILE, index=False)
     print(f"\n📁 Generated file: {OUTPUT_FILE}")
 
-    return df
\ No newline at end of file
+    return df
@@ -1,13 +1,21 @@
 # dataverse_apis/tasks/object_id_resolver.py
 from __future__ import annotations
-from dataclasses import dataclass, asdict, field
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Callable, Iterable, List, Dict, Any
+from urllib.parse import quote
 
 # Importa tu función real para llamar a Dataverse:
-from ..core.services.dataverse_client import call_dataverse  # ajusta si usas una clase
+from ..core.services.dataverse_client import (  # ajusta si usas una clase
+    BatchOperation,
+    call_dataverse,
+    call_dataverse_batch,
+)
 
 # --- Modelo simple y extensible ---
-@dataclass
+@dataclass(slots=True)
 class Target:
     entity: str
     ticket_number: str
@@ -22,88 +30,209 @@ class Target:
         # SharePoint usa "incident" cuando la entidad negocio es "case"
         return "incident" if self.entity.lower() == "case" else self.entity.lower()
 
+    def as_dict(self) -> Dict[str, Any]:
+        """Igual que dataclasses.asdict(self), sin recorrer los campos por reflexión."""
+        return {
+            "entity": self.entity,
+            "ticket_number": self.ticket_number,
+            "file": self.file,
+            "sheet": self.sheet,
+            "column": self.column,
+            "object_id": self.object_id,
+            "relative_urls": list(self.relative_urls),
+        }
+
 def to_targets(items: Iterable[Dict[str, Any]]) -> List[Target]:
     """Convierte una lista de dicts (tu formato actual) a dataclasses Target."""
     out: List[Target] = []
     for d in items:
+        get = d.get
+        relative_urls = get("relative_urls")
         out.append(
             Target(
-                entity=str(d.get("entity", "")).strip(),
-                ticket_number=str(d.get("ticket_number", "")).strip(),
-                file=str(d.get("file", "")),
-                sheet=str(d.get("sheet", "")),
-                column=str(d.get("column", "")),
-                object_id=d.get("object_id"),
-                relative_urls=list(d.get("relative_urls", [])) if d.get("relative_urls") else [],
+                entity=str(get("entity", "")).strip(),
+                ticket_number=str(get("ticket_number", "")).strip(),
+                file=str(get("file", "")),
+                sheet=str(get("sheet", "")),
+                column=str(get("column", "")),
+                object_id=get("object_id"),
+                relative_urls=list(relative_urls) if relative_urls else [],
             )
         )
     return out
 
 def to_dicts(items: Iterable[Target]) -> List[Dict[str, Any]]:
     """Convierte Targets de vuelta a dicts si tu UI/worker lo necesita."""
-    return [asdict(t) for t in items]
+    return [t.as_dict() for t in items]
+
+# Entidad de negocio -> (colección Web API, campo id, campo clave que se busca)
+_ENTITY_MAP: Dict[str, tuple[str, str, str]] = {
+    "account": ("accounts", "accountid", "accountnumber"),
+    "case": ("incidents", "incidentid", "ticketnumber"),
+    "ecase": ("icps_ecases", "icps_ecaseid", "icps_name"),
+    "inspection": ("icps_inspections", "icps_inspectionid", "icps_name"),
+    "investigation": ("icps_investigations", "icps_investigationid", "icps_name"),
+}
+
+# Endpoint por entidad, armado una sola vez: las claves van en un alias de parámetro (@p1),
+# fuera de la expresión $filter (In() = cualquiera de los valores, una consulta para varias claves)
+_ENDPOINT_TEMPLATES: Dict[str, str] = {
+    ent: (
+        f"{collection}?$select={id_field},{key_field}"
+        f"&$filter=Microsoft.Dynamics.CRM.In(PropertyName='{key_field}',PropertyValues=@p1)&@p1={{}}"
+    )
+    for ent, (collection, id_field, key_field) in _ENTITY_MAP.items()
+}
+
+def _endpoint_for(ent: str, keys: List[str]) -> str | None:
+    """Endpoint de búsqueda de `keys` (lista JSON de strings, codificada para la URL)."""
+    template = _ENDPOINT_TEMPLATES.get(ent)
+    if template is None:
+        return None
+    return template.format(quote(json.dumps(keys, separators=(",", ":")), safe=""))
+
+# Consultas a Dataverse en vuelo a la vez (comparten el pool de la sesión HTTP)
+RESOLVER_WORKERS = 8
+# Consultas GET por petición $batch
+RESOLVER_BATCH_SIZE = 100
+# Claves (ticket_number) por consulta: la URL debe seguir siendo corta
+RESOLVER_KEYS_PER_QUERY = 50
+
+@dataclass
+class _Query:
+    """Una consulta a Dataverse: hasta RESOLVER_KEYS_PER_QUERY claves de una misma entidad."""
+    ent: str
+    endpoint: str
+    id_field: str
+    key_field: str
+    # clave normalizada (casefold) -> targets con esa clave
+    targets: Dict[str, List[Target]]
 
 # --- Resolver de object_id por entidad (sencillo y explícito) ---
 class ObjectIdResolver:
     def __init__(self, dv_call: Callable[[str], Dict[str, Any]] = call_dataverse,
-                 logger: Callable[[str], None] | None = None) -> None:
+                 logger: Callable[[str], None] | None = None,
+                 max_workers: int = RESOLVER_WORKERS,
+                 dv_batch: Callable[..., Dict[str, Any]] | None = None) -> None:
         self.dv_call = dv_call
         self.log = logger or (lambda msg: None)
+        self.max_workers = max_workers
+        # $batch solo con el cliente real (un dv_call propio, p.ej. en pruebas, se respeta)
+        if dv_batch is None and dv_call is call_dataverse:
+            dv_batch = call_dataverse_batch
+        self.dv_batch = dv_batch
 
     def enrich_with_object_ids(self, targets: List[Target]) -> List[Target]:
-        """Itera targets y agrega .object_id según la entidad."""
+        """
+        Agrega .object_id a cada target según la entidad.
+        Los targets se agrupan por entidad y cada consulta busca RESOLVER_KEYS_PER_QUERY claves.
+        Las consultas van en peticiones $batch de RESOLVER_BATCH_SIZE (una a una si no hay
+        `dv_batch`), y esas peticiones se envían en paralelo, hasta `max_workers` a la vez.
+        """
+        queries = self._build_queries(targets)
+
+        if self.dv_batch:
+            jobs = [queries[i:i + RESOLVER_BATCH_SIZE] for i in range(0, len(queries), RESOLVER_BATCH_SIZE)]
+            run = self._resolve_batch
+        else:
+            jobs, run = queries, self._resolve_one
+
+        if len(jobs) <= 1 or self.max_workers <= 1:
+            for job in jobs:
+                run(job)
+            return targets
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            list(executor.map(run, jobs))
+        return targets
+
+    def _build_queries(self, targets: List[Target]) -> List[_Query]:
+        """Agrupa los targets por entidad y clave; los que no se pueden consultar quedan con object_id = None."""
+        buckets: Dict[str, Dict[str, List[Target]]] = defaultdict(dict)
         for t in targets:
-            ent = (t.entity or "").lower()
+            ent = (t.entity or "").strip().lower()
             key = (t.ticket_number or "").strip()
 
             if not ent or not key:
                 self.log("⚠️ Target sin 'entity' o 'ticket_number' — se omite.")
                 t.object_id = None
                 continue
-
-            endpoint, id_field = self._build_endpoint_and_id_field(ent, key)
-            if not endpoint:
+            if ent not in _ENTITY_MAP:
                 self.log(f"⚠️ Entidad desconocida '{ent}' — se omite.")
                 t.object_id = None
                 continue
 
-            try:
-                self.log(f"🔎 DV query: {endpoint}")
-                result = self.dv_call(endpoint) or {}
-                items = result.get("value") or []
-                if items:
-                    first = items[0]
-                    t.object_id = first.get(id_field) or first.get(id_field.lower())
-                    self.log(f"   ✓ {ent} {key} → {t.object_id}")
-                else:
+            # Targets repetidos (mismo ticket en varias filas/hojas) comparten una sola clave:
+            # se consulta una vez y el object_id se asigna a todos. `eq`/In() no distinguen
+            # mayúsculas, así que la clave va normalizada (casefold)
+            buckets[ent].setdefault(key.casefold(), []).append(t)
+
+        queries: List[_Query] = []
+        for ent, by_key in buckets.items():
+            _collection, id_field, key_field = _ENTITY_MAP[ent]
+            folded = list(by_key)
+            for i in range(0, len(folded), RESOLVER_KEYS_PER_QUERY):
+                chunk = {k: by_key[k] for k in folded[i:i + RESOLVER_KEYS_PER_QUERY]}
+                keys = [ts[0].ticket_number.strip() for ts in chunk.values()]
+                endpoint, _ = self._build_endpoint_and_id_field(ent, keys)
+                queries.append(_Query(ent, endpoint, id_field, key_field, chunk))
+        return queries
+
+    def _resolve_batch(self, queries: List[_Query]) -> None:
+        """Una petición $batch con un GET por consulta; lo que no responda se consulta por separado."""
+        self.log(f"🔎 DV $batch: {len(queries)} consultas")
+        try:
+            resp = self.dv_batch([BatchOperation("GET", q.endpoint) for q in queries], atomic=False)
+        except Exception as e:
+            resp = {"status": "error", "error": str(e), "responses": []}
+
+        responses = resp.get("responses") or []
+        for query, result in zip(queries, responses):
+            self._apply(query, result)
+
+        # $batch rechazado o cortado (Dataverse se detiene en el primer error): el resto, uno a uno
+        if len(responses) < len(queries):
+            if not responses:
+                self.log(f"   ⚠️ $batch sin respuestas ({resp.get('error')}) — consultas individuales.")
+            for query in queries[len(responses):]:
+                self._resolve_one(query)
+
+    def _resolve_one(self, query: _Query) -> None:
+        """Envía una consulta y asigna object_id a sus targets (None si no se encuentran)."""
+        try:
+            self.log(f"🔎 DV query: {query.endpoint}")
+            result = self.dv_call(query.endpoint) or {}
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+        self._apply(query, result)
+
+    def _apply(self, query: _Query, result: Dict[str, Any]) -> None:
+        """Asigna object_id a los targets de la consulta a partir de la respuesta (individual o parte del $batch)."""
+        if result.get("status") == "error":
+            for ts in query.targets.values():
+                for t in ts:
                     t.object_id = None
-                    self.log(f"   ⚠️ {ent} {key}: sin resultados.")
-            except Exception as e:
-                t.object_id = None
-                self.log(f"   ❌ Error DV ({ent} {key}): {e}")
+                self.log(f"   ❌ Error DV ({query.ent} {ts[0].ticket_number}): {result.get('error')}")
+            return
 
-        return targets
+        found: Dict[str, str] = {}
+        for item in result.get("value") or []:
+            object_id = item.get(query.id_field) or item.get(query.id_field.lower())
+            found.setdefault(str(item.get(query.key_field) or "").strip().casefold(), object_id)
+
+        for folded, ts in query.targets.items():
+            object_id = found.get(folded)
+            for t in ts:
+                t.object_id = object_id
+            key = ts[0].ticket_number.strip()
+            if object_id:
+                self.log(f"   ✓ {query.ent} {key} → {object_id}")
+            else:
+                self.log(f"   ⚠️ {query.ent} {key}: sin resultados.")
 
     # -------------------- helpers internos --------------------
-    # @staticmethod
-    # def _q(val: str) -> str:
-    #     return f"'{(val or '').replace(\"'\", \"''\")}'"
-
-    def _build_endpoint_and_id_field(self, ent: str, key: str) -> tuple[str | None, str | None]:
-        # q = self._q
-        if ent == "account":
-            return (f"accounts?$select=accountid&$filter=accountnumber eq {key}",
-                    "accountid")
-        if ent == "case":
-            return (f"incidents?$select=incidentid&$filter=ticketnumber eq {key}",
-                    "incidentid")
-        if ent == "ecase":
-            return (f"icps_ecases?$select=icps_ecaseid&$filter=icps_name eq {key}",
-                    "icps_ecaseid")
-        if ent == "inspection":
-            return (f"icps_inspections?$select=icps_inspectionid&$filter=icps_name eq {key}",
-                    "icps_inspectionid")
-        if ent == "investigation":
-            return (f"icps_investigations?$select=icps_investigationid&$filter=icps_name eq {key}",
-                    "icps_investigationid")
-        return (None, None)
+    def _build_endpoint_and_id_field(self, ent: str, keys: List[str]) -> tuple[str | None, str | None]:
+        endpoint = _endpoint_for(ent, keys)
+        if endpoint is None:
+            return (None, None)
+        return (endpoint, _ENTITY_MAP[ent][1])
@@ -1,19 +1,57 @@
+from functools import lru_cache
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from ..core.logging.logging_conf import get_logger
-from ..core.services.dataverse_client import call_dataverse
+from ..core.services.dataverse_client import call_dataverse, REQUEST_TIMEOUT
 from ..core.automation.sharepoint.sharepoint_downloader import download_from_sharepoint
 from urllib.parse import quote
 
 log = get_logger(__name__)
 
+# SharePoint REST calls reuse one connection pool (TCP/TLS keep-alive) like the Dataverse client
+_sharepoint_session = requests.Session()
+_sharepoint_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+def close_sharepoint_session() -> None:
+    """Close the pooled SharePoint connections (e.g. on shutdown); later calls reconnect."""
+    _sharepoint_session.close()
+
+@lru_cache(maxsize=1024)
+def _lookup_locations(object_id: str) -> tuple[dict, ...]:
+    location_query = f"sharepointdocumentlocations?$filter=_regardingobjectid_value eq {object_id}"
+    result = call_dataverse(location_query)
+    if result.get("status") == "error":
+        # Raising keeps the failure out of the cache (lru_cache only stores returned values)
+        raise RuntimeError(result.get("error"))
+    return tuple(result.get("value") or ())
+
+def _fetch_locations(object_id: str) -> list[dict]:
+    """
+    SharePoint document locations of a record ([] on error). Memoized per object ID, so the
+    lookups below share one request per record; failed lookups are retried next time.
+    """
+    try:
+        return [dict(location) for location in _lookup_locations(object_id)]
+    except RuntimeError as e:
+        log.warning("SharePoint document locations lookup failed for %s: %s", object_id, e)
+        return []
+
+def clear_locations_cache() -> None:
+    """Forget the memoized locations (e.g. after new folders were created for the records)."""
+    _lookup_locations.cache_clear()
+
 def get_documents_for_account(account_id):
     # Get Document Locations
-    location_query = f"sharepointdocumentlocations?$filter=_regardingobjectid_value eq {account_id}"
-    locations = call_dataverse(location_query)
+    locations = {"value": _fetch_locations(account_id)}
 
     if not locations["value"]:
         print("No SharePoint document locations found.")
-        log.info(f"No SharePoint document locations found for account ID: {account_id}")
+        log.info("No SharePoint document locations found for account ID: %s", account_id)
         return []
     
     # for loc in locations["value"]:
@@ -34,12 +72,11 @@ def get_documents_for_account(account_id):
 
 def get_relativeurls_for_object_id(object_id):
     # Query SharePoint document locations associated with the given object ID
-    location_query = f"sharepointdocumentlocations?$filter=_regardingobjectid_value eq {object_id}"
-    response = call_dataverse(location_query)
+    response = {"value": _fetch_locations(object_id)}
 
     if not response.get("value"):
         print(f"No SharePoint document locations found for object ID: {object_id}")
-        log.info(f"No SharePoint document locations found for object ID: {object_id}")
+        log.info("No SharePoint document locations found for object ID: %s", object_id)
         return []
 
     # Extract all 'relativeurl' values
@@ -49,12 +86,11 @@ def get_relativeurls_for_object_id(object_id):
 
 def get_latest_location_for_object_id(object_id):
     # Get Document Locations
-    location_query = f"sharepointdocumentlocations?$filter=_regardingobjectid_value eq {object_id}"
-    locations = call_dataverse(location_query)
+    locations = {"value": _fetch_locations(object_id)}
 
     if not locations["value"]:
         print("No SharePoint document locations found.")
-        log.info(f"No SharePoint document locations found for object ID: {object_id}")
+        log.info("No SharePoint document locations found for object ID: %s", object_id)
         return []
     
     lastest_relativeurl = get_most_recent_relativeurl(locations["value"])
@@ -62,41 +98,74 @@ def get_latest_location_for_object_id(object_id):
     return lastest_relativeurl
 
 def get_most_recent_relativeurl(locations):
-    locations_sorted = sorted(
-        locations,
-        key=lambda loc: loc.get("modifiedon", ""),
-        reverse=True
+    # One pass, no sorted copy; locations without a relativeurl cannot win
+    latest = max(
+        (loc for loc in locations if loc.get("relativeurl")),
+        key=lambda loc: loc.get("modifiedon") or "",
+        default=None,
     )
-    return locations_sorted[0]["relativeurl"] if locations_sorted else None
+    return latest["relativeurl"] if latest else None
+
+
+# Document libraries the ICPS site has (one per entity)
+_SHAREPOINT_LIBRARIES = frozenset({
+    "account", "incident", "icps_ecase", "icps_inspection", "icps_investigation",
+})
+# Business entity names (e.g. Target.sharepoint_entity) -> their document library
+_LIBRARY_BY_ENTITY = {
+    "case": "incident",
+    "ecase": "icps_ecase",
+    "inspection": "icps_inspection",
+    "investigation": "icps_investigation",
+}
+
+def _checked_relative_url(relativeurl: str) -> str:
+    """Stripped relative URL; rejects '..' segments, which would step out of the library folder."""
+    relativeurl = relativeurl.strip()
+    if ".." in relativeurl.replace("\\", "/").split("/"):
+        raise ValueError(f"Invalid SharePoint relative URL: {relativeurl!r}")
+    return relativeurl
+
+@lru_cache(maxsize=4096)
+def build_sharepoint_folder_url(relativeurl: str, entity_type: str):
+    relativeurl = _checked_relative_url(relativeurl)
 
+    # If it starts with "e-", use icps_ecase folder, otherwise the entity's library
+    if relativeurl.startswith("e-"):
+        library = "icps_ecase"
+    else:
+        library = _LIBRARY_BY_ENTITY.get(entity_type.lower(), entity_type.lower())
+        if library not in _SHAREPOINT_LIBRARIES:
+            raise ValueError(
+                f"Unknown SharePoint library {entity_type!r}; expected one of {sorted(_SHAREPOINT_LIBRARIES)}"
+            )
 
-def build_sharepoint_folder_url(relativeurl: str, entity_type: str):
     sharepoint_base_url = "https://ontariogov.sharepoint.com"
     sharepoint_site_path = "/sites/MGCS-CSOD/ICPS/"
 
     # Make sure to encode spaces and special characters
-    encoded_relativeurl = quote(relativeurl.strip())
+    encoded_relativeurl = quote(relativeurl)
 
-    # If it starts with "e-", use icps_ecase folder, otherwise use entity_type
-    if relativeurl.startswith("e-"):
-        full_url = f"{sharepoint_base_url}{sharepoint_site_path}icps_ecase/{encoded_relativeurl}"
-    else:
-        full_url = f"{sharepoint_base_url}{sharepoint_site_path}{entity_type}/{encoded_relativeurl}"
-    
-    return full_url
+    return f"{sharepoint_base_url}{sharepoint_site_path}{library}/{encoded_relativeurl}"
 
 def list_files_sharepoint_rest(relative_url, access_token):
     base_site = "https://ontariogov.sharepoint.com/sites/MGCS-CSOD"
-    folder_path = f"/sites/MGCS-CSOD/ICPS/account/{relative_url}"
+    folder_path = f"/sites/MGCS-CSOD/ICPS/account/{_checked_relative_url(relative_url)}"
+    # Inside the '...' string literal of the REST call a single quote is written twice
+    folder_path = folder_path.replace("'", "''")
     
-    url = f"{base_site}/_api/web/GetFolderByServerRelativeUrl('{folder_path}')/Files"
+    # Only the four fields used below, without per-item metadata (odata=nometadata)
+    url = (
+        f"{base_site}/_api/web/GetFolderByServerRelativeUrl('{folder_path}')/Files"
+        "?$select=Name,ServerRelativeUrl,TimeLastModified,Length"
+    )
     
     headers = {
         "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json;odata=verbose"
+        "Accept": "application/json;odata=nometadata"
     }
     
-    response = requests.get(url, headers=headers)
+    response = _sharepoint_session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
 
     if response.status_code != 200:
         print(f"Error: {response.status_code}")
@@ -104,7 +173,7 @@ def list_files_sharepoint_rest(relative_url, access_token):
         return []
 
     data = response.json()
-    results = data.get("d", {}).get("results", [])
+    results = data.get("value", [])
 
     return [
         {
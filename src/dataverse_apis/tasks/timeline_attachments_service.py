@@ -1,11 +1,16 @@
 # logic/services/timeline_attachments_service.py
 import os
+import re
 import sys
-import base64
+import binascii
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 
-from ..core.services.dataverse_client import call_dataverse
+from ..core.services.dataverse_client import call_dataverse_paged
 
 # ===== Helpers to align root with SharePoint downloader =====
 APP_NAME = "DataFlipper"
@@ -17,40 +22,82 @@ def _get_writable_base_dir() -> Path:
     - In dev mode: cwd
     """
     if getattr(sys, "frozen", False):
-        exe_dir = Path(sys.executable).parent
-        try:
-            t = exe_dir / ".perm_test"
-            t.write_text("ok", encoding="utf-8")
-            t.unlink(missing_ok=True)
-            return exe_dir
-        except Exception:
-            return Path(os.getenv("LOCALAPPDATA", str(Path.home()))) / APP_NAME
+        return _frozen_base_dir()
     return Path.cwd()
 
+@lru_cache(maxsize=1)
+def _frozen_base_dir() -> Path:
+    """Write probe next to the .exe: done once per process (the answer cannot change)."""
+    exe_dir = Path(sys.executable).parent
+    try:
+        t = exe_dir / ".perm_test"
+        t.write_text("ok", encoding="utf-8")
+        t.unlink(missing_ok=True)
+        return exe_dir
+    except Exception:
+        return Path(os.getenv("LOCALAPPDATA", str(Path.home()))) / APP_NAME
+
 def _downloads_root() -> Path:
     return (_get_writable_base_dir() / "downloads").resolve()
 
 # ===== File helpers =====
-_INVALID = '<>:"/\\|?*\0'
+# Characters Windows does not allow in file names (replaced in one C-level pass)
+_INVALID_RE = re.compile(r'[<>:"/\\|?*\x00]')
 def _safe_filename(name: str) -> str:
     if not name:
         return "file"
-    out = []
-    for ch in name:
-        out.append("_" if ch in _INVALID else ch)
-    s = "".join(out).strip().rstrip(". ")
+    s = _INVALID_RE.sub("_", name).strip().rstrip(". ")
     return s or "file"
 
 def _ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
-def _write_b64(dest: Path, b64: str) -> None:
-    _ensure_dir(dest.parent)
-    dest.write_bytes(base64.b64decode(b64))
+# Base64 characters decoded per write (multiple of 4: every slice decodes on its own)
+_B64_CHUNK = 1 << 16
+
+def _write_b64(dest: Path, b64: str, make_dir: bool = True) -> None:
+    """
+    Decode to disk slice by slice: only one chunk of the decoded file is in memory at a time.
+    make_dir=False when the caller already created dest.parent.
+    """
+    if make_dir:
+        _ensure_dir(dest.parent)
+    if "\n" in b64 or "\r" in b64:
+        b64 = "".join(b64.split())  # MIME line breaks would shift the 4-character alignment
+    with open(dest, "wb") as f:
+        for i in range(0, len(b64), _B64_CHUNK):
+            f.write(binascii.a2b_base64(b64[i:i + _B64_CHUNK]))  # b64decode's C core, no wrapper
 
 # ===== Service =====
+# Records per page (odata.maxpagesize); the fetchers follow @odata.nextLink to the end
 MAX_PAGE = 500
-PREFER = {"Prefer": f"odata.maxpagesize={MAX_PAGE}"}
+# Fetcher endpoints (%s = record GUID, or the email id filter). Only the columns the download uses are
+# selected, and empty files are filtered out server-side.
+_NOTES_ENDPOINT = (
+    "annotations"
+    "?$filter=isdocument eq true and filesize gt 0 and _objectid_value eq %s"
+    "&$select=annotationid,filename,documentbody"
+)
+_EMAILS_ENDPOINT = (
+    "emails"
+    "?$filter=_regardingobjectid_value eq %s"
+    "&$select=activityid,subject"
+    "&$orderby=createdon desc"
+)
+_EMAIL_ATTACHMENTS_ENDPOINT = (
+    "activitymimeattachments"
+    "?$filter=(%s) and filesize gt 0"
+    "&$select=activitymimeattachmentid,filename,body,_objectid_value"
+)
+# Emails whose attachments are listed by one request (keeps the URL well under the limit)
+EMAILS_PER_ATTACHMENT_QUERY = 50
+# Attachment listings in flight at once (the calls share the Dataverse session pool)
+ATTACHMENT_WORKERS = 8
+# Attachments decoded and written to disk at once
+WRITE_WORKERS = 4
+# Attachments handed to the writers but not written yet (each holds its base64 body in
+# memory): past this, the reader waits for a write to finish
+MAX_PENDING_WRITES = WRITE_WORKERS * 4
 
 class TimelineAttachmentsService:
     """
@@ -72,55 +119,95 @@ class TimelineAttachmentsService:
 
         counts = {"notes": 0, "emails": 0}
 
-        # ---- Notes (annotations with file) ----
-        for n in self._fetch_note_attachments(record_id):
-            fn  = _safe_filename(n.get("filename") or f"note_{n['annotationid']}.bin")
-            b64 = n.get("documentbody")
-            if b64:
-                _write_b64(notes_dir / fn, b64)
-                counts["notes"] += 1
-
-        # ---- Emails (activitymimeattachment) ----
-        email_map = self._fetch_emails(record_id)  # {email_id: subject}
-        for email_id, subject in email_map.items():
-            subject_part = _safe_filename(subject)[:120] or "no_subject"
-            for att in self._fetch_email_attachments(email_id):
-                fn  = _safe_filename(att.get("filename") or f"emailatt_{att['activitymimeattachmentid']}.bin")
-                b64 = att.get("body")
-                if b64:
-                    _write_b64(emails_dir / subject_part / fn, b64)
-                    counts["emails"] += 1
+        with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as writer:
+            written: Dict[Path, Future] = {}
+            made_dirs: set[Path] = set()
+            write_slots = threading.BoundedSemaphore(MAX_PENDING_WRITES)
+
+            def write(dest: Path, b64: str) -> None:
+                # Each folder is created once (here), not once per file by the writers
+                if dest.parent not in made_dirs:
+                    _ensure_dir(dest.parent)
+                    made_dirs.add(dest.parent)
+                # Same path twice (e.g. two notes with one name): wait for the first, the last one wins
+                previous = written.get(dest)
+                if previous is not None:
+                    previous.result()
+                write_slots.acquire()
+                try:
+                    future = writer.submit(_write_b64, dest, b64, False)
+                except BaseException:
+                    write_slots.release()
+                    raise
+                future.add_done_callback(lambda _f: write_slots.release())
+                written[dest] = future
+
+            # Requests on one pool, decoding/writing on another: files are written while
+            # the next responses are still arriving
+            with ThreadPoolExecutor(max_workers=ATTACHMENT_WORKERS) as fetcher:
+                email_map = self._fetch_emails(record_id)  # {email_id: subject}
+                # One listing per EMAILS_PER_ATTACHMENT_QUERY emails, at most
+                # ATTACHMENT_WORKERS in flight (each response carries the base64 bodies);
+                # results consumed in email order
+                email_ids = list(email_map)
+                chunks = iter([
+                    email_ids[i:i + EMAILS_PER_ATTACHMENT_QUERY]
+                    for i in range(0, len(email_ids), EMAILS_PER_ATTACHMENT_QUERY)
+                ])
+                in_flight: deque = deque()
+
+                def fetch_next() -> None:
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        in_flight.append((chunk, fetcher.submit(self._fetch_email_attachments, chunk)))
+
+                for _ in range(ATTACHMENT_WORKERS):
+                    fetch_next()
+
+                # ---- Notes (annotations with file) ----
+                # Streamed page by page on this thread while the email listings run
+                for n in self._fetch_note_attachments(record_id):
+                    fn  = _safe_filename(n.get("filename") or f"note_{n['annotationid']}.bin")
+                    b64 = n.get("documentbody")
+                    if b64:
+                        write(notes_dir / fn, b64)
+                        counts["notes"] += 1
+
+                # ---- Emails (activitymimeattachment) ----
+                while in_flight:
+                    chunk, future = in_flight.popleft()
+                    attachments_by_email = future.result()
+                    del future  # the listing is only referenced here: freed once written
+                    fetch_next()
+                    for email_id in chunk:
+                        subject_part = _safe_filename(email_map[email_id])[:120] or "no_subject"
+                        for att in attachments_by_email.get(email_id, ()):
+                            fn  = _safe_filename(att.get("filename") or f"emailatt_{att['activitymimeattachmentid']}.bin")
+                            b64 = att.get("body")
+                            if b64:
+                                write(emails_dir / subject_part / fn, b64)
+                                counts["emails"] += 1
+
+            # Re-raise any write error, as the sequential version did
+            for future in written.values():
+                future.result()
 
         return counts
 
     # ---- Fetchers ----
-    def _fetch_note_attachments(self, record_id: str) -> List[Dict]:
-        ep = (
-            "annotations"
-            f"?$filter=isdocument eq true and _objectid_value eq {record_id}"
-            "&$select=annotationid,filename,mimetype,documentbody,filesize,subject,createdon"
-            f"&$top={MAX_PAGE}"
-        )
-        data = call_dataverse(ep, method="GET", headers_extra=PREFER)
-        return data.get("value", [])
+    # Every page is followed (call_dataverse_paged): records past the first page are not dropped.
+    def _fetch_note_attachments(self, record_id: str) -> Iterator[Dict]:
+        return call_dataverse_paged(_NOTES_ENDPOINT % record_id, page_size=MAX_PAGE)
 
     def _fetch_emails(self, record_id: str) -> Dict[str, str]:
-        ep = (
-            "emails"
-            f"?$filter=_regardingobjectid_value eq {record_id}"
-            "&$select=activityid,subject,createdon"
-            "&$orderby=createdon desc"
-            f"&$top={MAX_PAGE}"
-        )
-        data = call_dataverse(ep, method="GET", headers_extra=PREFER)
-        return {row["activityid"]: row.get("subject") or "" for row in data.get("value", [])}
-
-    def _fetch_email_attachments(self, email_activity_id: str) -> List[Dict]:
-        ep = (
-            "activitymimeattachments"
-            f"?$filter=_objectid_value eq {email_activity_id}"
-            "&$select=activitymimeattachmentid,filename,mimetype,body,filesize"
-            f"&$top={MAX_PAGE}"
-        )
-        data = call_dataverse(ep, method="GET", headers_extra=PREFER)
-        return data.get("value", [])
\ No newline at end of file
+        rows = call_dataverse_paged(_EMAILS_ENDPOINT % record_id, page_size=MAX_PAGE)
+        return {row["activityid"]: row.get("subject") or "" for row in rows}
+
+    def _fetch_email_attachments(self, email_activity_ids: List[str]) -> Dict[str, List[Dict]]:
+        """Attachments of several emails in one listing, grouped by email id."""
+        # An or-chain on the lookup column, like the BUS ID lookups (one query for all the ids)
+        id_filter = " or ".join(f"_objectid_value eq {email_id}" for email_id in email_activity_ids)
+        by_email: Dict[str, List[Dict]] = {}
+        for att in call_dataverse_paged(_EMAIL_ATTACHMENTS_ENDPOINT % id_filter, page_size=MAX_PAGE):
+            by_email.setdefault(att.get("_objectid_value"), []).append(att)
+        return by_email
@@ -0,0 +1,116 @@
+import io
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+import requests
+
+# The real msal_auth builds the MSAL app (and may prompt for a login) at import time:
+# replace it with a token getter before dataverse_client imports it
+_auth = types.ModuleType("src.dataverse_apis.core.auth.msal_auth")
+_auth.get_access_token_with_msal_default = lambda force_refresh=False: "token"
+sys.modules["src.dataverse_apis.core.auth.msal_auth"] = _auth
+os.environ.setdefault("DATAVERSE_BASE_URI", "https://org.crm.dynamics.com")
+os.environ.setdefault("API_VERSION", "9.2")
+
+from src.dataverse_apis.core.services import dataverse_client  # noqa: E402
+
+
+def _response(status: int, body: bytes = b"", headers: dict | None = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.raw = io.BytesIO(body)  # streamed reads (call_dataverse_paged with ijson)
+    response.headers.update(headers or {})
+    response.url = "https://org.crm.dynamics.com/api/data/v9.2/accounts"
+    return response
+
+
+class CallDataverseErrorTests(unittest.TestCase):
+    """call_dataverse reports HTTP failures as a dict, it never raises."""
+
+    def call(self, *responses, token_getter=None):
+        send = mock.Mock(side_effect=list(responses))
+        token_getter = token_getter or mock.Mock(return_value="token")
+        with mock.patch.object(dataverse_client, "_send", send), \
+             mock.patch.object(dataverse_client, "get_access_token_with_msal_default", token_getter):
+            return dataverse_client.call_dataverse("accounts", method="GET"), send
+
+    def test_client_error_returns_error_dict(self):
+        body = b'{"error": {"code": "0x80040217", "message": "Not found"}}'
+        result, _ = self.call(_response(404, body, {"Content-Type": "application/json"}))
+
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["status_code"], 404)
+        self.assertEqual(result["error"], "HTTP 404")
+        self.assertEqual(result["details"], {"error": {"code": "0x80040217", "message": "Not found"}})
+
+    def test_server_error_with_text_body_returns_error_dict(self):
+        result, _ = self.call(_response(500, b"Internal Server Error"))
+
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["status_code"], 500)
+        self.assertEqual(result["details"], "Internal Server Error")
+
+    def test_throttled_reports_retry_after(self):
+        result, _ = self.call(_response(429, b"", {"Retry-After": "12"}))
+
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["status_code"], 429)
+        self.assertEqual(result["details"]["retry_after"], "12")
+
+    def test_unauthorized_refreshes_token_once(self):
+        token_getter = mock.Mock(return_value="token")
+        result, send = self.call(_response(401), _response(401), token_getter=token_getter)
+
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["status_code"], 401)
+        self.assertEqual(send.call_count, 2)
+        token_getter.assert_called_with(force_refresh=True)
+
+    def test_network_error_returns_error_dict(self):
+        result, _ = self.call(requests.ConnectionError("connection reset"))
+
+        self.assertEqual(result["status"], "error")
+        self.assertIsNone(result["status_code"])
+        self.assertIn("connection reset", result["error"])
+
+    def test_success_returns_payload(self):
+        result, _ = self.call(_response(200, b'{"value": []}', {"Content-Type": "application/json"}))
+
+        self.assertEqual(result, {"status": "success", "status_code": 200, "value": []})
+
+
+class CallDataversePagedTests(unittest.TestCase):
+    """call_dataverse_paged follows nextLink and refreshes a rejected token once per page."""
+
+    def paged(self, *responses):
+        request = mock.Mock(side_effect=list(responses))
+        token_getter = mock.Mock(return_value="token")
+        with mock.patch.object(dataverse_client, "_request", request), \
+             mock.patch.object(dataverse_client, "get_access_token_with_msal_default", token_getter):
+            return list(dataverse_client.call_dataverse_paged("accounts")), request, token_getter
+
+    def test_follows_next_link(self):
+        first = b'{"value": [{"id": 1}], "@odata.nextLink": "https://org.crm.dynamics.com/next"}'
+        records, request, _ = self.paged(_response(200, first), _response(200, b'{"value": [{"id": 2}]}'))
+
+        self.assertEqual(records, [{"id": 1}, {"id": 2}])
+        self.assertEqual(request.call_args_list[1].args[1], "https://org.crm.dynamics.com/next")
+
+    def test_unauthorized_page_is_retried_with_a_fresh_token(self):
+        records, request, token_getter = self.paged(_response(401), _response(200, b'{"value": [{"id": 1}]}'))
+
+        self.assertEqual(records, [{"id": 1}])
+        self.assertEqual(request.call_count, 2)
+        token_getter.assert_called_with(force_refresh=True)
+
+    def test_unauthorized_twice_raises(self):
+        with self.assertRaises(requests.HTTPError):
+            self.paged(_response(401), _response(401))
+
+
+if __name__ == "__main__":
+    unittest.main()